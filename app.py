@@ -1,5 +1,6 @@
-from flask import Flask, request, jsonify, send_file, render_template, url_for, send_from_directory
+from flask import Flask, request, jsonify, send_file, render_template, url_for, Response, stream_with_context, redirect
 from flask_cors import CORS
+from werkzeug.utils import safe_join
 import os
 import time
 import logging
@@ -8,9 +9,23 @@ import requests
 from functools import partial
 import threading
 import random
+import secrets
 import tempfile
-from moviepy.editor import VideoFileClip
-import ffmpeg
+import trim_engine
+from concurrent.futures import ThreadPoolExecutor
+from job_queue import JobQueue
+from transcode_pool import TranscodePool
+from preset_tuner import PresetTuner
+from chunked_upload import ChunkedUploads, UploadError
+from cookie_store import cookie_digest, get_cookie_store
+from ytdl_pool import get_ytdl_pool
+from rate_limiter import get_host_rate_limiter
+from metadata_cache import MetadataCache
+from download_index import DownloadIndex, CACHED, CLAIMED
+from progress_stream import ProgressBroker, stream_progress
+from job_store import create_job_store
+from range_response import send_file_ranged
+from urllib.parse import urlparse, parse_qs
 
 # Set up logging
 logging.basicConfig(
@@ -36,9 +51,18 @@ os.makedirs(TEMP_FOLDER, exist_ok=True)
 UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads'))
 MAX_VIDEO_SIZE = 500 * 1024 * 1024  # 500MB max upload size
 ALLOWED_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv', 'webm'}
+# Large files arrive through /api/uploads in chunks that each fit under MAX_CONTENT_LENGTH
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Resumable uploads in progress, shared by every worker through the upload folder
+chunked_uploads = ChunkedUploads(UPLOAD_FOLDER, MAX_VIDEO_SIZE)
+# One cookies file per distinct cookie text, shared by the requests that send it
+cookie_store = get_cookie_store(TEMP_FOLDER)
+# Warm yt-dlp instances, reused by metadata lookups, downloads and streams with the same options
+ytdl_pool = get_ytdl_pool()
+
 # Clean up old downloads and temp files periodically
 def cleanup_files():
     try:
@@ -49,8 +73,10 @@ def cleanup_files():
         # Clean downloads
         for filename in os.listdir(DOWNLOAD_FOLDER):
             file_path = os.path.join(DOWNLOAD_FOLDER, filename)
+            if download_index.is_referenced(filename):
+                continue
             if os.path.isfile(file_path):
-                file_age = current_time - os.path.getmtime(file_path)
+                file_age = current_time - download_index.last_used(filename)
                 if file_age > max_age:
                     try:
                         os.remove(file_path)
@@ -58,17 +84,20 @@ def cleanup_files():
                     except Exception as e:
                         logger.error(f"Error cleaning up {filename}: {e}")
         
-        # Clean temp files
-        for filename in os.listdir(TEMP_FOLDER):
-            if filename.startswith('user_cookies_'):
-                file_path = os.path.join(TEMP_FOLDER, filename)
-                file_age = current_time - os.path.getmtime(file_path)
-                if file_age > max_age:
-                    try:
-                        os.remove(file_path)
-                        logger.info(f"Cleaned up temp file: {filename}")
-                    except Exception as e:
-                        logger.error(f"Error cleaning up temp file {filename}: {e}")
+        # Close idle yt-dlp instances first; they hold their cookie files
+        closed = ytdl_pool.prune()
+        if closed:
+            logger.info(f"Closed {closed} idle yt-dlp instances")
+        
+        # Clean cookie files no request has used for an hour
+        removed = cookie_store.purge()
+        if removed:
+            logger.info(f"Cleaned up {removed} unused cookie files")
+        
+        # Drop resumable uploads that were abandoned
+        removed = chunked_uploads.purge()
+        if removed:
+            logger.info(f"Cleaned up {removed} abandoned uploads")
                         
     except Exception as e:
         logger.error(f"Error in cleanup: {e}")
@@ -79,33 +108,82 @@ def schedule_cleanup():
         cleanup_files()
         time.sleep(3600)  # Sleep for 1 hour
 
-# Start cleanup thread
-cleanup_thread = threading.Thread(target=schedule_cleanup, daemon=True)
-cleanup_thread.start()
+# Start cleanup thread. Under `python app.py`, transcode_pool's spawned workers re-import
+# this module as __mp_main__; they only need its definitions, and a cleanup pass there
+# could not see the files this process is serving. The rest of the module-level setup
+# is safe to repeat in them: stores and folders are created idempotently, and queues,
+# the transcode pool and the preset benchmark only start threads on first use.
+if __name__ != '__mp_main__':
+    cleanup_thread = threading.Thread(target=schedule_cleanup, daemon=True)
+    cleanup_thread.start()
 
 def save_user_cookies(cookies_str: str) -> str:
-    """Save user cookies to a temporary file and return the file path"""
+    """Return the file holding these cookies; repeats of the same cookies reuse one file"""
     try:
-        # Create a temporary file with random name
-        cookie_file = os.path.join(TEMP_FOLDER, f'user_cookies_{random.randint(1000, 9999)}.txt')
-        
-        # Clean up the cookie string
-        cookies_str = cookies_str.strip()
-        if not cookies_str.startswith('# Netscape HTTP Cookie File'):
-            cookies_str = '# Netscape HTTP Cookie File\n' + cookies_str
-        
-        with open(cookie_file, 'w') as f:
-            f.write(cookies_str)
-            
-        logger.info(f"Saved cookies to file: {cookie_file}")
-        return cookie_file
+        return cookie_store.save(cookies_str)
     except Exception as e:
         logger.error(f"Error saving cookies: {e}")
         return None
 
-# Global dictionaries for tracking downloads
-download_progress = {}
-download_cache = {}
+def youtube_dl(opts):
+    """A warm yt_dlp.YoutubeDL from the pool, configured by opts for one job"""
+    return ytdl_pool.borrow(opts)
+
+# Job state for downloads and uploads, shared by all worker processes by default
+JOB_STORE = os.getenv('JOB_STORE', 'sqlite')
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', os.path.join(TEMP_FOLDER, 'jobs.sqlite3'))
+download_progress = create_job_store(JOB_STORE, JOB_STORE_PATH)
+
+# Wakes /api/progress/stream subscribers when a job's state changes
+progress_broker = ProgressBroker()
+PROGRESS_STREAM_MAX_RATE = float(os.getenv('PROGRESS_STREAM_MAX_RATE', 4))
+PROGRESS_STREAM_MAX_DURATION = float(os.getenv('PROGRESS_STREAM_MAX_DURATION', 60))
+# Jobs running in other worker processes can't wake this one, so streams also poll the store
+PROGRESS_STREAM_POLL_INTERVAL = float(os.getenv('PROGRESS_STREAM_POLL_INTERVAL', 1))
+
+def update_progress(job_id, state):
+    """Record a job's state and notify streaming subscribers"""
+    download_progress.set(job_id, state)
+    progress_broker.publish()
+
+# Extracted video metadata, keyed by canonical video ID
+metadata_cache = MetadataCache(
+    max_entries=int(os.getenv('METADATA_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('METADATA_CACHE_TTL', 3600)),
+    db_path=os.getenv('METADATA_CACHE_DB') or None
+)
+
+# Postprocessing applied to every download; part of the deduplication key
+MERGE_OUTPUT_FORMAT = 'mp4'
+DOWNLOAD_POSTPROCESSORS = [{
+    'key': 'FFmpegVideoConvertor',
+    'preferedformat': 'mp4',
+}]
+
+# Finished downloads are indexed by (video, format, postprocessing) so repeats reuse them
+download_index = DownloadIndex(DOWNLOAD_FOLDER)
+
+# Downloads run on a worker pool so /api/download returns immediately
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', 2))
+download_queue = JobQueue(DOWNLOAD_WORKERS, name='download')
+
+# Upload trimming/compression runs in worker processes sharing a CPU budget
+transcode_pool = TranscodePool(
+    cpu_budget=int(os.getenv('TRANSCODE_CPU_BUDGET', 0)),
+    max_jobs=int(os.getenv('TRANSCODE_JOBS', 0))
+)
+
+# x264 preset for size-targeted compression, benchmarked once per host
+preset_tuner = PresetTuner(
+    os.path.join(TEMP_FOLDER, 'x264_presets.json'),
+    tolerance=float(os.getenv('TARGET_SIZE_TOLERANCE', 0.1)),
+    threads=transcode_pool.threads_per_job
+)
+
+# Metadata extraction runs concurrently; every yt-dlp call is paced per host by a
+# token bucket that speeds up while the host answers and backs off when it pushes back
+VIDEO_INFO_CONCURRENCY = int(os.getenv('VIDEO_INFO_CONCURRENCY', 4))
+host_rate_limiter = get_host_rate_limiter()
 
 # List of User-Agents for rotation
 USER_AGENTS = [
@@ -116,31 +194,41 @@ USER_AGENTS = [
     'Mozilla/5.0 (iPhone; CPU iPhone OS 16_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1'
 ]
 
-def get_yt_dlp_opts(quality='best', cookies_str=None, is_shorts=False):
-    # Randomly select a User-Agent
-    selected_user_agent = random.choice(USER_AGENTS)
-    
+def get_format_string(quality='best', is_shorts=False):
+    """yt-dlp format selector for a quality setting"""
     # Special format string for shorts
     if is_shorts:
-        format_string = 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4] / bv*+ba/b'
+        return 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4] / bv*+ba/b'
+    
+    # Regular format strings for normal videos
+    if quality == 'highest':
+        return 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4] / bv*+ba/b'
+    elif quality == '1080p':
+        return 'bv*[height<=1080][ext=mp4]+ba[ext=m4a]/b[height<=1080][ext=mp4] / bv*[height<=1080]+ba/b[height<=1080]'
+    elif quality == '720p':
+        return 'bv*[height<=720][ext=mp4]+ba[ext=m4a]/b[height<=720][ext=mp4] / bv*[height<=720]+ba/b[height<=720]'
+    elif quality == '480p':
+        return 'bv*[height<=480][ext=mp4]+ba[ext=m4a]/b[height<=480][ext=mp4] / bv*[height<=480]+ba/b[height<=480]'
+    elif quality == '360p':
+        return 'bv*[height<=360][ext=mp4]+ba[ext=m4a]/b[height<=360][ext=mp4] / bv*[height<=360]+ba/b[height<=360]'
     else:
-        # Regular format strings for normal videos
-        if quality == 'highest':
-            format_string = 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4] / bv*+ba/b'
-        elif quality == '1080p':
-            format_string = 'bv*[height<=1080][ext=mp4]+ba[ext=m4a]/b[height<=1080][ext=mp4] / bv*[height<=1080]+ba/b[height<=1080]'
-        elif quality == '720p':
-            format_string = 'bv*[height<=720][ext=mp4]+ba[ext=m4a]/b[height<=720][ext=mp4] / bv*[height<=720]+ba/b[height<=720]'
-        elif quality == '480p':
-            format_string = 'bv*[height<=480][ext=mp4]+ba[ext=m4a]/b[height<=480][ext=mp4] / bv*[height<=480]+ba/b[height<=480]'
-        elif quality == '360p':
-            format_string = 'bv*[height<=360][ext=mp4]+ba[ext=m4a]/b[height<=360][ext=mp4] / bv*[height<=360]+ba/b[height<=360]'
-        else:
-            format_string = 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4] / bv*+ba/b'
+        return 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4] / bv*+ba/b'
+
+def get_progressive_format_string(quality='best'):
+    """yt-dlp format selector limited to single mp4 files that carry both audio and video"""
+    height = {'1080p': 1080, '720p': 720, '480p': 480, '360p': 360}.get(quality)
+    limit = f'[height<={height}]' if height else ''
+    return f'b[ext=mp4][protocol^=http][protocol!*=dash]{limit}'
+
+def get_yt_dlp_opts(quality='best', cookies_str=None, is_shorts=False, url=None):
+    # Randomly select a User-Agent
+    selected_user_agent = random.choice(USER_AGENTS)
+    
+    format_string = get_format_string(quality, is_shorts)
 
     opts = {
         'format': format_string,
-        'merge_output_format': 'mp4',
+        'merge_output_format': MERGE_OUTPUT_FORMAT,
         'quiet': False,
         'no_warnings': False,
         'verbose': True,
@@ -148,7 +236,6 @@ def get_yt_dlp_opts(quality='best', cookies_str=None, is_shorts=False):
         'socket_timeout': 30,
         'retries': 15,
         'fragment_retries': 15,
-        'retry_sleep_functions': {'http': lambda n: 5 * (2 ** (n-1))},
         'force_generic_extractor': False,
         'nocheckcertificate': True,
         'ignoreerrors': False,
@@ -188,15 +275,13 @@ def get_yt_dlp_opts(quality='best', cookies_str=None, is_shorts=False):
         'prefer_insecure': True,
         'allow_unplayable_formats': True,  # Changed to True for shorts
         'check_formats': False,  # Changed to False for shorts
-        'postprocessors': [{
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': 'mp4',
-        }],
+        'postprocessors': [dict(pp) for pp in DOWNLOAD_POSTPROCESSORS],
     }
 
-    # Add random sleep between requests with longer delays
-    opts['sleep_interval'] = random.randint(3, 6)
-    opts['max_sleep_interval'] = 8
+    # Retries wait on the host's limiter, so they shorten while it is healthy and stretch after a backoff
+    if url:
+        retry_delay = host_rate_limiter.bucket(url).retry_delay
+        opts['retry_sleep_functions'] = {'http': retry_delay, 'fragment': retry_delay}
 
     # Add cookies if provided
     if cookies_str:
@@ -214,99 +299,162 @@ def get_yt_dlp_opts(quality='best', cookies_str=None, is_shorts=False):
     
     return opts
 
+def normalize_video_url(url):
+    """Return (url, is_shorts, cache_key) with shorts links rewritten to the watch?v= form.
+
+    The cache key is the canonical video ID for single YouTube videos so every
+    URL form of the same video maps to one entry; other URLs key on themselves.
+    """
+    url = url.strip()
+    is_shorts = '/shorts/' in url
+    if is_shorts:
+        video_id = url.split('/shorts/')[1].split('?')[0]
+        url = f'https://www.youtube.com/watch?v={video_id}'
+        logger.info(f"Converted shorts URL to: {url}")
+    
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    query = parse_qs(parsed.query)
+    video_id = None
+    if 'list' not in query:
+        if host.endswith('youtube.com') and parsed.path == '/watch':
+            video_id = query.get('v', [None])[0]
+        elif host.endswith('youtube.com') and parsed.path.startswith(('/embed/', '/live/')):
+            video_id = parsed.path.split('/')[2]
+        elif host == 'youtu.be':
+            video_id = parsed.path.lstrip('/').split('/')[0]
+    
+    cache_key = f'youtube:{video_id}' if video_id else url
+    return url, is_shorts, cache_key
+
+# Only the format fields used for best-format selection are cached
+CACHED_FORMAT_FIELDS = ('format_id', 'ext', 'width', 'height', 'resolution', 'format_note')
+
+def extract_video_metadata(url, cookies_str=None, is_shorts=False):
+    """Run yt-dlp extraction and return the subset of info that get_video_info needs"""
+    # Wait for the host's rate limiter instead of a fixed delay
+    waited = host_rate_limiter.acquire(url)
+    if waited:
+        logger.info(f"Rate limited for {waited:.2f}s before extracting {url}")
+    
+    if not cookies_str:
+        logger.warning("No cookies provided. This may result in bot detection.")
+        
+    ydl_opts = get_yt_dlp_opts(cookies_str=cookies_str, is_shorts=is_shorts, url=url)
+    ydl_opts.update({
+        'extract_flat': True,
+        'quiet': True,
+        'no_warnings': True
+    })
+    
+    with youtube_dl(ydl_opts) as ydl:
+        try:
+            logger.info("Starting video extraction...")
+            info = ydl.extract_info(url, download=False)
+            
+            if not info:
+                logger.error("No info returned from yt-dlp")
+                raise Exception("No video information found")
+            
+            # For playlists, get the first video
+            if 'entries' in info:
+                if not info['entries']:
+                    logger.error("No entries in playlist")
+                    raise Exception("No videos found in playlist")
+                info = info['entries'][0]
+            
+            host_rate_limiter.record_success(url)
+            return {
+                'title': info.get('title', 'Unknown Title'),
+                'duration': info.get('duration', 0),
+                'thumbnail': info.get('thumbnail', None),
+                'webpage_url': info.get('webpage_url', url),
+                'formats': [
+                    {field: f.get(field) for field in CACHED_FORMAT_FIELDS if f.get(field) is not None}
+                    for f in info.get('formats', [])
+                ]
+            }
+            
+        except yt_dlp.utils.DownloadError as e:
+            error_msg = str(e)
+            if host_rate_limiter.record_error(url, error_msg):
+                logger.warning(f"Backing off {host_rate_limiter.host_key(url)} after: {error_msg}")
+            if "Sign in to confirm your age" in error_msg:
+                logger.error("Age-restricted video detected")
+                raise Exception("This video is age-restricted. Please provide cookies from a logged-in account.")
+            elif "Sign in to confirm you're not a bot" in error_msg:
+                logger.error("Bot detection triggered")
+                if not cookies_str:
+                    raise Exception("YouTube thinks we're a bot. Please provide cookies from a logged-in account to bypass this.")
+                else:
+                    raise Exception("Bot detection triggered even with cookies. Please try with fresh cookies from a recently logged-in account.")
+            else:
+                logger.error(f"Download error: {error_msg}")
+                raise
+
 def get_video_info(url, cookies_str=None):
     try:
         logger.info(f"Getting info for URL: {url}")
         
-        # Check if it's a shorts URL
-        is_shorts = '/shorts/' in url
+        url, is_shorts, cache_key = normalize_video_url(url)
+        if cookies_str and cookies_str.strip():
+            # A logged-in extraction can see private or age-restricted videos; keep it to that cookie set
+            cache_key = f'{cache_key}#cookies:{cookie_digest(cookies_str)}'
+        
+        metadata = metadata_cache.get(cache_key)
+        if metadata is None:
+            metadata = extract_video_metadata(url, cookies_str, is_shorts)
+            metadata_cache.set(cache_key, metadata)
+        else:
+            logger.info(f"Metadata cache hit for {cache_key}")
+        
+        # Get best available format
+        formats = metadata['formats']
+        best_format = None
+        
+        # For shorts, prefer vertical video formats
         if is_shorts:
-            video_id = url.split('/shorts/')[1].split('?')[0]
-            url = f'https://www.youtube.com/watch?v={video_id}'
-            logger.info(f"Converted shorts URL to: {url}")
+            for f in formats:
+                if f.get('ext') == 'mp4' and f.get('height', 0) > f.get('width', 0):
+                    best_format = f
+                    break
         
-        # Add random delay
-        time.sleep(random.uniform(2, 4))
+        # If no vertical format found or not shorts, use regular format selection
+        if not best_format:
+            for f in formats:
+                if f.get('ext') == 'mp4' and f.get('format_note') in ['720p', '1080p']:
+                    best_format = f
+                    break
         
-        if not cookies_str:
-            logger.warning("No cookies provided. This may result in bot detection.")
-            
-        ydl_opts = get_yt_dlp_opts(cookies_str=cookies_str, is_shorts=is_shorts)
-        ydl_opts.update({
-            'extract_flat': True,
-            'quiet': True,
-            'no_warnings': True
-        })
+        if not best_format and formats:
+            best_format = formats[-1]
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            try:
-                logger.info("Starting video extraction...")
-                info = ydl.extract_info(url, download=False)
-                
-                if not info:
-                    logger.error("No info returned from yt-dlp")
-                    raise Exception("No video information found")
-                
-                # For playlists, get the first video
-                if 'entries' in info:
-                    if not info['entries']:
-                        logger.error("No entries in playlist")
-                        raise Exception("No videos found in playlist")
-                    info = info['entries'][0]
-                
-                # Get best available format
-                formats = info.get('formats', [])
-                best_format = None
-                
-                # For shorts, prefer vertical video formats
-                if is_shorts:
-                    for f in formats:
-                        if f.get('ext') == 'mp4' and f.get('height', 0) > f.get('width', 0):
-                            best_format = f
-                            break
-                
-                # If no vertical format found or not shorts, use regular format selection
-                if not best_format:
-                    for f in formats:
-                        if f.get('ext') == 'mp4' and f.get('format_note') in ['720p', '1080p']:
-                            best_format = f
-                            break
-                
-                if not best_format and formats:
-                    best_format = formats[-1]
-                
-                result = {
-                    'url': url,
-                    'title': info.get('title', 'Unknown Title'),
-                    'duration': info.get('duration', 0),
-                    'thumbnail': info.get('thumbnail', None),
-                    'webpage_url': info.get('webpage_url', url),
-                    'format': f"{best_format.get('format_id', '')} - {best_format.get('resolution', '')} ({best_format.get('format_note', '')})" if best_format else 'best',
-                    'is_shorts': is_shorts
-                }
-                logger.info(f"Successfully extracted video info: {result}")
-                return result
-                
-            except yt_dlp.utils.DownloadError as e:
-                error_msg = str(e)
-                if "Sign in to confirm your age" in error_msg:
-                    logger.error("Age-restricted video detected")
-                    raise Exception("This video is age-restricted. Please provide cookies from a logged-in account.")
-                elif "Sign in to confirm you're not a bot" in error_msg:
-                    logger.error("Bot detection triggered")
-                    if not cookies_str:
-                        raise Exception("YouTube thinks we're a bot. Please provide cookies from a logged-in account to bypass this.")
-                    else:
-                        raise Exception("Bot detection triggered even with cookies. Please try with fresh cookies from a recently logged-in account.")
-                else:
-                    logger.error(f"Download error: {error_msg}")
-                    raise
+        result = {
+            'url': url,
+            'title': metadata['title'],
+            'duration': metadata['duration'],
+            'thumbnail': metadata['thumbnail'],
+            'webpage_url': metadata['webpage_url'],
+            'format': f"{best_format.get('format_id', '')} - {best_format.get('resolution', '')} ({best_format.get('format_note', '')})" if best_format else 'best',
+            'is_shorts': is_shorts
+        }
+        logger.info(f"Successfully extracted video info: {result}")
+        return result
                 
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error getting video info: {error_msg}")
         return {'error': error_msg}
 
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    return jsonify(metadata_cache.stats())
+
+@app.route('/api/rate-limits')
+def get_rate_limits():
+    """Current request rate and throttling history of each host this worker has contacted"""
+    return jsonify(host_rate_limiter.snapshot())
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -322,20 +470,26 @@ def get_videos_info():
 
         logger.info(f"Received video info request for URLs: {urls}")
 
-        for url in urls:
+        def extract(url):
             try:
-                info = get_video_info(url, cookies)
-                if 'error' in info:
-                    error_msg = f"Error with URL {url}: {info['error']}"
-                    logger.error(error_msg)
-                    errors.append(error_msg)
-                else:
-                    videos_info.append(info)
-                    logger.info(f"Successfully extracted info: {info}")
+                return get_video_info(url, cookies)
             except Exception as e:
-                error_msg = f"Error with URL {url}: {str(e)}"
+                return {'error': str(e)}
+
+        # Extract concurrently; map() keeps results in input order
+        infos = []
+        if urls:
+            with ThreadPoolExecutor(max_workers=min(VIDEO_INFO_CONCURRENCY, len(urls))) as executor:
+                infos = list(executor.map(extract, urls))
+
+        for url, info in zip(urls, infos):
+            if 'error' in info:
+                error_msg = f"Error with URL {url}: {info['error']}"
                 logger.error(error_msg)
                 errors.append(error_msg)
+            else:
+                videos_info.append(info)
+                logger.info(f"Successfully extracted info: {info}")
 
         response_data = {
             'videos': videos_info,
@@ -348,9 +502,17 @@ def get_videos_info():
         logger.error(f"Error in video info endpoint: {error_msg}")
         return jsonify({'error': error_msg}), 500
 
-def handle_download_error(error_msg, cookies_str=None):
-    """Handle different types of download errors and return appropriate messages"""
-    if "HTTP Error 403" in error_msg:
+def handle_download_error(error_msg, cookies_str=None, url=None):
+    """Handle different types of download errors and return appropriate messages
+
+    With a url, throttling errors (403, 429, bot detection) also slow down
+    the host's rate limiter.
+    """
+    if url and host_rate_limiter.record_error(url, error_msg):
+        logger.warning(f"Backing off {host_rate_limiter.host_key(url)} after: {error_msg}")
+    if "HTTP Error 429" in error_msg or "Too Many Requests" in error_msg:
+        return "YouTube is rate limiting requests. Please wait a few minutes and try again."
+    elif "HTTP Error 403" in error_msg:
         if not cookies_str:
             return "Access forbidden by YouTube. Please provide cookies from a logged-in account."
         else:
@@ -384,6 +546,89 @@ def validate_video_file(file_path):
     except Exception as e:
         return False, str(e)
 
+def run_download_job(url, filename, quality, cookies, download_url):
+    """Download a single URL into DOWNLOAD_FOLDER, reporting state through download_progress"""
+    output_path = os.path.join(DOWNLOAD_FOLDER, filename)
+    update_progress(filename, {
+        'status': 'downloading',
+        'progress': 0,
+        'url': url
+    })
+    try:
+        # Configure yt-dlp options
+        ydl_opts = get_yt_dlp_opts(quality, cookies, url=url)
+        ydl_opts.update({
+            'outtmpl': output_path,
+            'progress_hooks': [partial(handle_progress, filename=filename)],
+        })
+        
+        # Start download with retry mechanism
+        max_retries = 3
+        retry_count = 0
+        last_error = None
+        
+        # Every attempt waits its turn; retries also wait the host's retry delay first
+        host_rate_limiter.acquire(url)
+        while retry_count < max_retries:
+            try:
+                with youtube_dl(ydl_opts) as ydl:
+                    logger.info(f"Starting download for URL: {url} (Attempt {retry_count + 1}/{max_retries})")
+                    logger.info(f"Using format: {ydl_opts['format']}")
+                    ydl.download([url])
+                    
+                    # Validate the downloaded file
+                    is_valid, error_msg = validate_video_file(output_path)
+                    if not is_valid:
+                        raise Exception(f"Invalid video file: {error_msg}")
+                        
+                    host_rate_limiter.record_success(url)
+                    break  # If successful, break the retry loop
+                    
+            except Exception as e:
+                last_error = handle_download_error(str(e), cookies, url)
+                retry_count += 1
+                # Clean up invalid file if it exists
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                    
+                if retry_count < max_retries:
+                    # Backs off exponentially from the host's current pace, and further after a throttle
+                    delay = host_rate_limiter.bucket(url).retry_delay(retry_count - 1)
+                    logger.warning(f"Attempt {retry_count} failed, retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
+                    # The next attempt is a new request, so it waits its turn like one
+                    host_rate_limiter.acquire(url)
+                else:
+                    raise Exception(last_error)
+        
+        # Get file size
+        file_size = os.path.getsize(output_path)
+        
+        update_progress(filename, {
+            'status': 'completed',
+            'progress': 100,
+            'url': url,
+            'download_url': download_url,
+            'filename': filename,
+            'file_size': file_size
+        })
+        logger.info(f"Download completed for {url}, size: {file_size} bytes")
+        
+    except Exception as e:
+        error_msg = str(e)
+        logger.error(f"Error downloading {url}: {error_msg}")
+        update_progress(filename, {
+            'status': 'error',
+            'progress': 0,
+            'url': url,
+            'error': error_msg
+        })
+        # Clean up any failed download
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    finally:
+        download_index.finish(filename)
+
 @app.route('/api/download', methods=['POST'])
 def download_video():
     try:
@@ -397,106 +642,274 @@ def download_video():
         if not urls:
             logger.error("No URLs provided")
             return jsonify({'error': 'No URLs provided'}), 400
-
-        # Process each URL
+        
+        # Queue each URL; the filename doubles as the job ID for progress tracking
+        format_string = get_format_string(quality)
+        postprocessing = {'merge_output_format': MERGE_OUTPUT_FORMAT, 'postprocessors': DOWNLOAD_POSTPROCESSORS}
         results = []
         for url in urls:
-            try:
-                # Generate unique filename
-                filename = f"video_{int(time.time())}_{random.randint(1000, 9999)}.mp4"
-                output_path = os.path.join(DOWNLOAD_FOLDER, filename)
-                
-                # Configure yt-dlp options
-                ydl_opts = get_yt_dlp_opts(quality, cookies)
-                ydl_opts.update({
-                    'outtmpl': output_path,
-                    'progress_hooks': [partial(handle_progress, filename=filename)],
+            _, _, video_key = normalize_video_url(url)
+            filename = DownloadIndex.make_filename(video_key, format_string, postprocessing)
+            download_url = url_for('static', filename=f'downloads/{filename}', _external=True)
+            
+            reservation = download_index.reserve(filename)
+            if reservation == CACHED:
+                # Same video at the same quality is already on disk
+                file_size = os.path.getsize(os.path.join(DOWNLOAD_FOLDER, filename))
+                update_progress(filename, {
+                    'status': 'completed',
+                    'progress': 100,
+                    'url': url,
+                    'download_url': download_url,
+                    'filename': filename,
+                    'file_size': file_size
                 })
-                
-                # Start download with retry mechanism
-                max_retries = 3
-                retry_count = 0
-                last_error = None
-                
-                while retry_count < max_retries:
-                    try:
-                        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                            logger.info(f"Starting download for URL: {url} (Attempt {retry_count + 1}/{max_retries})")
-                            logger.info(f"Using format: {ydl_opts['format']}")
-                            ydl.download([url])
-                            
-                            # Validate the downloaded file
-                            is_valid, error_msg = validate_video_file(output_path)
-                            if not is_valid:
-                                raise Exception(f"Invalid video file: {error_msg}")
-                                
-                            break  # If successful, break the retry loop
-                            
-                    except Exception as e:
-                        last_error = str(e)
-                        retry_count += 1
-                        # Clean up invalid file if it exists
-                        if os.path.exists(output_path):
-                            os.remove(output_path)
-                            
-                        if retry_count < max_retries:
-                            logger.warning(f"Attempt {retry_count} failed, retrying in {5 * retry_count} seconds...")
-                            time.sleep(5 * retry_count)  # Exponential backoff
-                        else:
-                            raise Exception(handle_download_error(last_error, cookies))
-                
-                # Get file size
-                file_size = os.path.getsize(output_path)
-                
-                # Generate download URL
-                download_url = url_for('static', filename=f'downloads/{filename}', _external=True)
-                
                 results.append({
                     'url': url,
                     'status': 'success',
+                    'job_id': filename,
                     'download_url': download_url,
                     'filename': filename,
                     'file_size': file_size
                 })
-                logger.info(f"Download completed for {url}, size: {file_size} bytes")
-                
-            except Exception as e:
-                error_msg = handle_download_error(str(e), cookies)
-                logger.error(f"Error downloading {url}: {error_msg}")
-                results.append({
-                    'url': url,
-                    'status': 'error',
-                    'error': error_msg
+                logger.info(f"Reusing existing download {filename} for {url}")
+                continue
+            
+            if reservation == CLAIMED:
+                update_progress(filename, {
+                    'status': 'queued',
+                    'progress': 0,
+                    'url': url
                 })
-                # Clean up any failed download
-                if os.path.exists(output_path):
-                    os.remove(output_path)
+                download_queue.submit(run_download_job, url, filename, quality, cookies, download_url)
+                logger.info(f"Queued download for {url} as job {filename}")
+            else:
+                logger.info(f"Joining in-flight download {filename} for {url}")
+            
+            results.append({
+                'url': url,
+                'status': 'queued',
+                'job_id': filename,
+                'filename': filename,
+                'progress_url': url_for('get_progress', filename=filename, _external=True)
+            })
         
-        return jsonify({'results': results})
+        return jsonify({'results': results}), 202
         
     except Exception as e:
         error_msg = handle_download_error(str(e), cookies)
         logger.error(f"Error in download endpoint: {error_msg}")
         return jsonify({'error': error_msg}), 500
 
+# Chunk size used when forwarding a source stream to the client
+STREAM_CHUNK_SIZE = 256 * 1024
+
+class TeeStream:
+    """Iterates a source response body, teeing it into DOWNLOAD_FOLDER when filename is set
+
+    The copy is written to a .part file and only renamed into place once the
+    whole body has arrived, so an interrupted stream never leaves a truncated
+    file behind for later requests to reuse. close() is safe to call more than
+    once and also runs when the client disconnects before the first chunk.
+    """
+
+    def __init__(self, upstream, url, filename=None, download_url=None):
+        self.upstream = upstream
+        self.url = url
+        self.filename = filename
+        self.download_url = download_url
+        self.expected_size = None
+        if not upstream.headers.get('Content-Encoding'):
+            self.expected_size = int(upstream.headers.get('Content-Length') or 0) or None
+        self.output_path = os.path.join(DOWNLOAD_FOLDER, filename) if filename else None
+        self.part_path = f'{self.output_path}.part' if filename else None
+        self.part_file = None
+        self.received = 0
+        self.completed = False
+        self.closed = False
+
+    def __iter__(self):
+        if self.part_path:
+            self.part_file = open(self.part_path, 'wb')
+        for chunk in self.upstream.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if not chunk:
+                continue
+            self.received += len(chunk)
+            if self.part_file:
+                self.part_file.write(chunk)
+                update_progress(self.filename, {
+                    'status': 'downloading',
+                    'progress': (self.received / self.expected_size) * 100 if self.expected_size else 0,
+                    'url': self.url
+                })
+            yield chunk
+        
+        if self.part_file:
+            self.part_file.close()
+            if self.expected_size and self.received != self.expected_size:
+                raise Exception(f"Stream ended after {self.received} of {self.expected_size} bytes")
+            os.replace(self.part_path, self.output_path)
+            update_progress(self.filename, {
+                'status': 'completed',
+                'progress': 100,
+                'url': self.url,
+                'download_url': self.download_url,
+                'filename': self.filename,
+                'file_size': self.received
+            })
+        self.completed = True
+        logger.info(f"Streamed {self.received} bytes for {self.url}")
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.upstream.close()
+        if not self.filename:
+            return
+        if self.part_file:
+            self.part_file.close()
+        if not self.completed:
+            logger.warning(f"Stream for {self.url} stopped after {self.received} bytes; discarding cache copy")
+            if os.path.exists(self.part_path):
+                os.remove(self.part_path)
+            update_progress(self.filename, {
+                'status': 'error',
+                'progress': 0,
+                'url': self.url,
+                'error': 'Stream was interrupted'
+            })
+        download_index.finish(self.filename)
+
+@app.route('/api/stream-download', methods=['GET', 'POST'])
+def stream_download():
+    """Forward a progressive video to the client while it downloads, caching a copy on disk"""
+    url = request.values.get('url', '').strip()
+    quality = request.values.get('quality', 'highest')
+    cookies = request.values.get('cookies', '')
+    if not url:
+        return jsonify({'error': 'No URL provided'}), 400
+    
+    _, _, video_key = normalize_video_url(url)
+    format_string = get_progressive_format_string(quality)
+    filename = DownloadIndex.make_filename(video_key, format_string, None)
+    
+    reservation = download_index.reserve(filename)
+    if reservation == CACHED:
+        # Already on disk: let serve_download handle ranges and caching
+        return redirect(url_for('serve_download', filename=filename))
+    claimed = reservation == CLAIMED
+    
+    try:
+        ydl_opts = get_yt_dlp_opts(quality, cookies, url=url)
+        ydl_opts.update({
+            'format': format_string,
+            'quiet': True,
+            'no_warnings': True
+        })
+        host_rate_limiter.acquire(url)
+        with youtube_dl(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            # The cookies yt-dlp used, plus any the site set during extraction; copied
+            # because the pooled instance's jar goes back to the pool
+            cookie_jar = requests.cookies.RequestsCookieJar()
+            for cookie in ydl.cookiejar:
+                cookie_jar.set_cookie(cookie)
+        if info and info.get('entries'):
+            info = info['entries'][0]
+        if not info or info.get('requested_formats') or not info.get('url'):
+            if claimed:
+                download_index.finish(filename)
+            return jsonify({'error': 'No single-file format is available for streaming; use /api/download instead'}), 409
+        
+        # Same cookies and proxy as the queued path, so formats that need them stream too
+        proxy = ydl_opts.get('proxy')
+        upstream = requests.get(info['url'], headers=info.get('http_headers', {}), cookies=cookie_jar,
+                                proxies={'http': proxy, 'https': proxy} if proxy else None,
+                                stream=True, timeout=(10, 60))
+        if upstream.status_code != 200:
+            upstream.close()
+            raise Exception(f"Source returned HTTP Error {upstream.status_code}")
+        host_rate_limiter.record_success(url)
+    except Exception as e:
+        if claimed:
+            download_index.finish(filename)
+        error_msg = handle_download_error(str(e), cookies, url)
+        logger.error(f"Error starting stream for {url}: {error_msg}")
+        return jsonify({'error': error_msg}), 502
+    
+    if claimed:
+        update_progress(filename, {
+            'status': 'downloading',
+            'progress': 0,
+            'url': url
+        })
+        download_url = url_for('static', filename=f'downloads/{filename}', _external=True)
+        tee = TeeStream(upstream, url, filename, download_url)
+    else:
+        # Another request is already caching this file; just forward the bytes
+        tee = TeeStream(upstream, url)
+    
+    response = Response(stream_with_context(iter(tee)))
+    response.call_on_close(tee.close)
+    response.mimetype = 'video/mp4'
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Job-Id'] = filename
+    if upstream.headers.get('Content-Length') and not upstream.headers.get('Content-Encoding'):
+        response.content_length = int(upstream.headers['Content-Length'])
+    logger.info(f"Streaming {url} as {filename} (caching: {claimed})")
+    return response
+
+def get_job_state(job_id):
+    return download_progress.get(job_id, {
+        'status': 'unknown',
+        'progress': 0
+    })
+
 @app.route('/api/progress/<filename>')
 def get_progress(filename):
     try:
-        progress_data = download_progress.get(filename, {
-            'status': 'unknown',
-            'progress': 0
-        })
-        return jsonify(progress_data)
+        return jsonify(get_job_state(filename))
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
+@app.route('/api/progress/stream')
+def stream_job_progress():
+    """Server-Sent Events stream of progress for one or more comma-separated job IDs"""
+    job_ids = [job_id for job_id in request.args.get('jobs', '').split(',') if job_id]
+    if not job_ids:
+        return jsonify({'error': 'No jobs provided'}), 400
+    
+    # Clients may ask for fewer updates, never more than the server allows
+    max_rate = request.args.get('max_rate', PROGRESS_STREAM_MAX_RATE, type=float)
+    if not max_rate or max_rate <= 0 or max_rate > PROGRESS_STREAM_MAX_RATE:
+        max_rate = PROGRESS_STREAM_MAX_RATE
+    
+    events = stream_progress(
+        job_ids,
+        get_job_state,
+        progress_broker,
+        max_rate=max_rate,
+        max_duration=PROGRESS_STREAM_MAX_DURATION,
+        poll_interval=PROGRESS_STREAM_POLL_INTERVAL
+    )
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.route('/static/downloads/<path:filename>')
 def serve_download(filename):
     try:
         # Ensure the file exists
-        file_path = os.path.join(DOWNLOAD_FOLDER, filename)
-        if not os.path.exists(file_path):
-            logger.error(f"File not found: {file_path}")
+        file_path = safe_join(DOWNLOAD_FOLDER, filename)
+        if file_path is None or not os.path.isfile(file_path):
+            logger.error(f"File not found: {filename}")
             return jsonify({'error': 'File not found'}), 404
             
         # Get file size
@@ -505,19 +918,21 @@ def serve_download(filename):
             logger.error(f"File is empty: {file_path}")
             return jsonify({'error': 'File is empty'}), 404
             
-        # Set content disposition to force download
-        response = send_from_directory(
-            DOWNLOAD_FOLDER, 
-            filename, 
-            as_attachment=True,
-            attachment_filename=filename
-        )
-        response.headers['Content-Length'] = file_size
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        
-        logger.info(f"Serving file for download: {filename}, size: {file_size} bytes")
+        # Hold a reference while the file is streamed so cleanup skips it
+        download_index.acquire(filename)
+        try:
+            response = send_file_ranged(
+                request,
+                file_path,
+                filename,
+                on_close=partial(download_index.release, filename)
+            )
+        except Exception:
+            download_index.release(filename)
+            raise
+        
+        logger.info(f"Serving file for download: {filename}, status: {response.status_code}, "
+                    f"bytes: {response.content_length} of {file_size}")
         return response
         
     except Exception as e:
@@ -534,68 +949,130 @@ def handle_progress(d, filename):
             else:
                 progress = 0
             
-            download_progress[filename] = {
+            update_progress(filename, {
                 'status': 'downloading',
                 'progress': progress,
                 'speed': d.get('speed', 0),
                 'eta': d.get('eta', 0)
-            }
+            })
         except Exception as e:
             logger.error(f"Error updating progress: {str(e)}")
     
     elif d['status'] == 'finished':
-        download_progress[filename] = {
-            'status': 'completed',
+        # yt-dlp may still merge/convert; the job marks itself completed afterwards
+        update_progress(filename, {
+            'status': 'processing',
             'progress': 100
-        }
+        })
     
     elif d['status'] == 'error':
-        download_progress[filename] = {
+        update_progress(filename, {
             'status': 'error',
             'error': str(d.get('error', 'Unknown error'))
-        }
+        })
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def process_video(input_path, output_path, start_time, end_time, target_size=None, max_duration=15):
+def submit_video(input_path, output_path, start_time, end_time, target_size=None, max_duration=15, exact=False):
+    """Queue a trim/compress job on the transcode pool; the future resolves to (success, error)"""
+    # Ensure video doesn't exceed max duration
+    if end_time - start_time > max_duration:
+        end_time = start_time + max_duration
+    preset = preset_tuner.preset() if target_size else None
+    return transcode_pool.submit(
+        trim_engine.process_clip, input_path, output_path, start_time, end_time, target_size, exact,
+        preset=preset
+    )
+
+def finish_upload_job(job_id, input_path, download_url, future):
+    """Record the outcome of an async upload job once its transcode finishes"""
+    # Clean up input file
+    if os.path.exists(input_path):
+        os.remove(input_path)
     try:
-        # Load the video
-        video = VideoFileClip(input_path)
-        
-        # Ensure video doesn't exceed max duration
-        if end_time - start_time > max_duration:
-            end_time = start_time + max_duration
+        success, error = future.result()
+    except Exception as e:
+        success, error = False, str(e)
+    if success:
+        update_progress(job_id, {
+            'status': 'completed',
+            'progress': 100,
+            'download_url': download_url
+        })
+    else:
+        update_progress(job_id, {
+            'status': 'error',
+            'progress': 0,
+            'error': error
+        })
+
+def parse_trim_options(values):
+    """Trim settings from an upload request's form or JSON body"""
+    target_size = values.get('target_size')  # In MB
+    return {
+        'start_time': float(values.get('start_time', 0)),
+        'end_time': float(values.get('end_time', 15)),
+        'target_size': float(target_size) * 1024 * 1024 if target_size else None,  # Convert MB to bytes
+        'exact': str(values.get('exact', '')).lower() in ('1', 'true', 'on')
+    }
+
+def new_upload_filename():
+    return f"upload_{int(time.time())}_{secrets.token_hex(4)}.mp4"
+
+def queue_upload(original_name, filename, options):
+    """Submit a saved upload (already at input_<filename>) to the transcode pool"""
+    input_path = os.path.join(UPLOAD_FOLDER, f"input_{filename}")
+    output_path = os.path.join(UPLOAD_FOLDER, filename)
+    # Generate download URL now; pool callbacks run outside the request context
+    download_url = url_for('static', 
+                         filename=f'uploads/{filename}', 
+                         _external=True)
+    future = submit_video(
+        input_path, 
+        output_path, 
+        options['start_time'], 
+        options['end_time'], 
+        options['target_size'],
+        exact=options['exact']
+    )
+    return {'filename': original_name}, filename, input_path, download_url, future
+
+def report_uploads(jobs, results, run_async):
+    """Fill in each job's result, waiting for the transcodes unless running async"""
+    if run_async:
+        for result, filename, input_path, download_url, future in jobs:
+            update_progress(filename, {'status': 'processing', 'progress': 0})
+            future.add_done_callback(partial(finish_upload_job, filename, input_path, download_url))
+            result.update({
+                'status': 'queued',
+                'task_id': filename,
+                'progress_url': url_for('get_progress', filename=filename, _external=True)
+            })
+        return jsonify({'results': results}), 202
+    
+    for result, filename, input_path, download_url, future in jobs:
+        try:
+            success, error = future.result()
+        except Exception as e:
+            success, error = False, str(e)
         
-        # Trim the video
-        video = video.subclip(start_time, end_time)
+        # Clean up input file
+        if os.path.exists(input_path):
+            os.remove(input_path)
         
-        if target_size:
-            # Calculate target bitrate based on desired file size
-            duration = end_time - start_time
-            target_bitrate = (target_size * 8) / duration  # Convert size to bits and divide by duration
-            
-            # Use ffmpeg-python for compression
-            stream = ffmpeg.input(input_path)
-            stream = ffmpeg.output(stream, output_path,
-                                 **{'c:v': 'libx264',
-                                    'b:v': f'{target_bitrate}k',
-                                    'maxrate': f'{target_bitrate * 1.5}k',
-                                    'bufsize': f'{target_bitrate * 3}k',
-                                    'c:a': 'aac',
-                                    'b:a': '128k',
-                                    'ss': str(start_time),
-                                    't': str(end_time - start_time)})
-            ffmpeg.run(stream, overwrite_output=True)
+        if success:
+            result.update({
+                'status': 'success',
+                'download_url': download_url
+            })
         else:
-            # Just trim without compression
-            video.write_videofile(output_path, codec='libx264', audio_codec='aac')
-        
-        video.close()
-        return True, None
-        
-    except Exception as e:
-        return False, str(e)
+            result.update({
+                'status': 'error',
+                'error': error
+            })
+    
+    return jsonify({'results': results})
 
 @app.route('/api/upload-videos', methods=['POST'])
 def upload_videos():
@@ -604,54 +1081,25 @@ def upload_videos():
             return jsonify({'error': 'No videos provided'}), 400
             
         files = request.files.getlist('videos[]')
-        start_time = float(request.form.get('start_time', 0))
-        end_time = float(request.form.get('end_time', 15))
-        target_size = request.form.get('target_size')  # In MB
-        
-        if target_size:
-            target_size = float(target_size) * 1024 * 1024  # Convert MB to bytes
+        options = parse_trim_options(request.form)
+        # Async mode returns a task per file right away; progress is reported like downloads
+        run_async = request.form.get('async', '').lower() in ('1', 'true', 'on')
         
         results = []
+        jobs = []
         
+        # Save every upload first, then let the pool transcode them side by side
         for file in files:
             if file and allowed_file(file.filename):
                 # Generate unique filename
-                filename = f"upload_{int(time.time())}_{random.randint(1000, 9999)}.mp4"
-                input_path = os.path.join(UPLOAD_FOLDER, f"input_{filename}")
-                output_path = os.path.join(UPLOAD_FOLDER, filename)
+                filename = new_upload_filename()
                 
                 # Save uploaded file
-                file.save(input_path)
-                
-                # Process the video
-                success, error = process_video(
-                    input_path, 
-                    output_path, 
-                    start_time, 
-                    end_time, 
-                    target_size
-                )
+                file.save(os.path.join(UPLOAD_FOLDER, f"input_{filename}"))
                 
-                # Clean up input file
-                if os.path.exists(input_path):
-                    os.remove(input_path)
-                
-                if success:
-                    # Generate download URL
-                    download_url = url_for('static', 
-                                         filename=f'uploads/{filename}', 
-                                         _external=True)
-                    results.append({
-                        'filename': file.filename,
-                        'status': 'success',
-                        'download_url': download_url
-                    })
-                else:
-                    results.append({
-                        'filename': file.filename,
-                        'status': 'error',
-                        'error': error
-                    })
+                job = queue_upload(file.filename, filename, options)
+                results.append(job[0])
+                jobs.append(job)
             else:
                 results.append({
                     'filename': file.filename,
@@ -659,11 +1107,102 @@ def upload_videos():
                     'error': 'Invalid file type'
                 })
         
-        return jsonify({'results': results})
+        return report_uploads(jobs, results, run_async)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def upload_error_response(e):
+    response = jsonify({'error': str(e)})
+    response.status_code = e.status
+    if e.offset is not None:
+        response.headers['Upload-Offset'] = str(e.offset)
+    return response
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable upload: {"filename": ..., "size": bytes}"""
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename', '')
+    if not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    try:
+        upload_id = chunked_uploads.create(filename, int(data.get('size', 0)))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid upload size'}), 400
+    except UploadError as e:
+        return upload_error_response(e)
+    upload_url = url_for('upload_status', upload_id=upload_id, _external=True)
+    response = jsonify({
+        'upload_id': upload_id,
+        'offset': 0,
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+        'upload_url': upload_url
+    })
+    response.status_code = 201
+    response.headers['Location'] = upload_url
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Bytes received so far; also answers HEAD with just the Upload-Offset header"""
+    try:
+        state = chunked_uploads.get(upload_id)
+    except UploadError as e:
+        return upload_error_response(e)
+    response = jsonify({'filename': state['filename'], 'size': state['size'], 'offset': state['offset']})
+    response.headers['Upload-Offset'] = str(state['offset'])
+    response.headers['Upload-Length'] = str(state['size'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT', 'PATCH'])
+def upload_chunk(upload_id):
+    """Append the raw request body at the offset given in the Upload-Offset header"""
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.args.get('offset', '')))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header required'}), 400
+    try:
+        offset = chunked_uploads.write(upload_id, offset, request.stream, request.content_length)
+    except UploadError as e:
+        return upload_error_response(e)
+    response = jsonify({'offset': offset})
+    response.headers['Upload-Offset'] = str(offset)
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def cancel_upload(upload_id):
+    try:
+        chunked_uploads.delete(upload_id)
+    except UploadError as e:
+        return upload_error_response(e)
+    return '', 204
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Finish a resumable upload and process it; takes the same options as /api/upload-videos"""
+    values = request.get_json(silent=True) or request.form
+    filename = new_upload_filename()
+    input_path = os.path.join(UPLOAD_FOLDER, f"input_{filename}")
+    try:
+        options = parse_trim_options(values)
+        state = chunked_uploads.complete(upload_id, input_path)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except UploadError as e:
+        return upload_error_response(e)
+    run_async = str(values.get('async', '')).lower() in ('1', 'true', 'on')
+    try:
+        job = queue_upload(state['filename'], filename, options)
+    except Exception as e:
+        # Keep the assembled upload so the client can complete it again
+        logger.error(f"Error queueing upload {upload_id}: {e}")
+        chunked_uploads.restore(upload_id, input_path)
+        return jsonify({'error': 'Could not queue the upload; try completing it again'}), 503
+    chunked_uploads.delete(upload_id)
+    return report_uploads([job], [job[0]], run_async)
+
 if __name__ == '__main__':
     # Get port from environment variable (Render sets this)
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,145 @@
+"""Benchmark proxy list validation against a local farm of fake proxies
+
+Starts a process that listens on many local ports, each acting as a proxy
+with its own behaviour (fast, slow, error status, never answering, or not
+listening at all), then validates the whole list with the asyncio validator
+used by ProxyManager and, for comparison, with a thread pool of blocking
+requests. Reports throughput and how well each run recovered the known-good set.
+
+    python benchmarks/proxy_validation.py --proxies 2000 --concurrency 500 --timeout 2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from proxy_manager import validate_proxies  # noqa: E402
+
+TEST_URL = 'http://validation.test/'
+
+# Share of the farm for each behaviour
+GOOD, ERROR, BLACKHOLE, DEAD = 'good', 'error', 'blackhole', 'dead'
+MIX = [(GOOD, 0.6), (ERROR, 0.15), (BLACKHOLE, 0.15), (DEAD, 0.1)]
+
+
+def plan_farm(count: int, seed: int):
+    rng = random.Random(seed)
+    kinds = []
+    for kind, share in MIX:
+        kinds += [kind] * int(count * share)
+    kinds += [GOOD] * (count - len(kinds))
+    rng.shuffle(kinds)
+    # Good proxies answer after 5-300 ms
+    return [(kind, rng.uniform(0.005, 0.3)) for kind in kinds]
+
+
+async def _serve_farm(plan, conn) -> None:
+    async def handle(reader, writer, kind, delay):
+        try:
+            await reader.readuntil(b'\r\n\r\n')
+            if kind == BLACKHOLE:
+                await asyncio.sleep(3600)
+            await asyncio.sleep(delay)
+            status = b'200 OK' if kind == GOOD else b'502 Bad Gateway'
+            writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok')
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    addresses = []
+    servers = []
+    for kind, delay in plan:
+        if kind == DEAD:
+            # A port that was free a moment ago and has nothing listening
+            with socket.socket() as s:
+                s.bind(('127.0.0.1', 0))
+                port = s.getsockname()[1]
+        else:
+            server = await asyncio.start_server(
+                lambda r, w, k=kind, d=delay: handle(r, w, k, d), '127.0.0.1', 0, backlog=64
+            )
+            servers.append(server)
+            port = server.sockets[0].getsockname()[1]
+        addresses.append(f'127.0.0.1:{port}')
+    conn.send(addresses)
+    await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+    # Skip cancelling thousands of stalled handlers; the sockets close with the process
+    os._exit(0)
+
+
+def run_farm(plan, conn) -> None:
+    asyncio.run(_serve_farm(plan, conn))
+
+
+def validate_with_threads(addresses, workers: int, timeout: float):
+    """Pre-asyncio approach: blocking requests on a thread pool"""
+    def check(address):
+        started = time.monotonic()
+        try:
+            response = requests.get(TEST_URL, proxies={'http': f'http://{address}'}, timeout=timeout)
+            if response.status_code == 200:
+                return address, time.monotonic() - started
+        except requests.RequestException:
+            pass
+        return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [r for r in executor.map(check, addresses) if r is not None]
+
+
+def report(name, addresses, expected, working, elapsed) -> None:
+    found = {address for address, _ in working}
+    good = expected & set(addresses)
+    recall = len(found & good) / len(good) if good else 1.0
+    false_positives = len(found - good)
+    print(f'{name:>18}: {len(addresses):6d} proxies in {elapsed:7.2f}s '
+          f'({len(addresses) / elapsed:8.1f}/s), kept {len(found)}, '
+          f'recall {recall:.1%}, false positives {false_positives}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--proxies', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--timeout', type=float, default=2.0)
+    parser.add_argument('--thread-workers', type=int, default=50)
+    parser.add_argument('--thread-sample', type=int, default=500,
+                        help='Proxies checked by the thread-pool baseline (it is much slower)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    plan = plan_farm(args.proxies, args.seed)
+    parent, child = multiprocessing.Pipe()
+    farm = multiprocessing.Process(target=run_farm, args=(plan, child), daemon=True)
+    farm.start()
+    addresses = parent.recv()
+    expected = {address for address, (kind, _) in zip(addresses, plan) if kind == GOOD}
+
+    try:
+        started = time.monotonic()
+        working = validate_proxies(addresses, TEST_URL, concurrency=args.concurrency, timeout=args.timeout)
+        report('asyncio', addresses, expected, working, time.monotonic() - started)
+        fastest = [round(latency * 1000) for _, latency in working[:3]]
+        print(f'{"":>18}  fastest latencies (ms): {fastest}')
+
+        sample = addresses[:args.thread_sample]
+        started = time.monotonic()
+        working = validate_with_threads(sample, args.thread_workers, args.timeout)
+        report(f'threads x{args.thread_workers}', sample, expected, working, time.monotonic() - started)
+    finally:
+        parent.send('stop')
+        farm.join(timeout=5)
+
+
+if __name__ == '__main__':
+    main()
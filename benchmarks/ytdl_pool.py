@@ -0,0 +1,123 @@
+"""Benchmark the warm YoutubeDL pool against building an instance per request
+
+Each request builds options the way the app does (random User-Agent, a
+cookies file, retry sleep function, per-job output template and progress
+hook) and then either constructs a fresh yt_dlp.YoutubeDL or borrows one
+from ytdl_pool. With --extract, every request also runs a metadata
+extraction of a file served from a local HTTP server, to show the saving
+as a share of a whole request rather than of construction alone.
+
+    python benchmarks/ytdl_pool.py --requests 200 --cookies 50 --extract
+"""
+import argparse
+import functools
+import http.server
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import yt_dlp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ytdl_pool import YoutubeDLPool  # noqa: E402
+
+USER_AGENTS = [f'Mozilla/5.0 (benchmark) Agent/{n}' for n in range(5)]
+
+
+def write_cookies(folder: str, count: int) -> str:
+    path = os.path.join(folder, 'user_cookies_benchmark.txt')
+    expires = int(time.time()) + 86400
+    with open(path, 'w') as f:
+        f.write('# Netscape HTTP Cookie File\n')
+        for n in range(count):
+            f.write(f'.youtube.com\tTRUE\t/\tTRUE\t{expires}\tcookie{n}\tvalue{n}\n')
+    return path
+
+
+def make_opts(cookiefile: str, folder: str, n: int):
+    return {
+        'format': 'best',
+        'quiet': True,
+        'no_warnings': True,
+        'socket_timeout': 30,
+        'retries': 15,
+        'retry_sleep_functions': {'http': lambda n: 5 * (2 ** (n - 1))},
+        'nocheckcertificate': True,
+        'http_headers': {'User-Agent': random.choice(USER_AGENTS), 'Accept': '*/*'},
+        'cookiefile': cookiefile,
+        'postprocessors': [{'key': 'FFmpegVideoRemuxer', 'preferedformat': 'mp4'}],
+        'sleep_interval': random.randint(3, 6),
+        'max_sleep_interval': 8,
+        'outtmpl': os.path.join(folder, f'{n}.%(ext)s'),
+        'progress_hooks': [lambda d: None],
+    }
+
+
+def serve(folder: str):
+    handler = functools.partial(QuietHandler, directory=folder)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def run(name, requests, job) -> float:
+    started = time.perf_counter()
+    for n in range(requests):
+        job(n)
+    elapsed = time.perf_counter() - started
+    print(f'{name:>10}: {requests} requests in {elapsed:6.2f}s, {elapsed / requests * 1000:7.2f} ms per request')
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--cookies', type=int, default=50, help='Cookies in the cookies file')
+    parser.add_argument('--extract', action='store_true', help='Also extract a locally served file per request')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as folder:
+        cookiefile = write_cookies(folder, args.cookies)
+        with open(os.path.join(folder, 'video.mp4'), 'wb') as f:
+            f.write(os.urandom(64 * 1024))
+        server = serve(folder) if args.extract else None
+        url = f'http://127.0.0.1:{server.server_address[1]}/video.mp4' if server else None
+
+        def work(ydl):
+            if url:
+                ydl.extract_info(url, download=False)
+
+        def fresh(n):
+            with yt_dlp.YoutubeDL(make_opts(cookiefile, folder, n)) as ydl:
+                work(ydl)
+
+        pool = YoutubeDLPool()
+
+        def pooled(n):
+            with pool.borrow(make_opts(cookiefile, folder, n)) as ydl:
+                work(ydl)
+
+        try:
+            baseline = run('fresh', args.requests, fresh)
+            warm = run('pooled', args.requests, pooled)
+            saved = (baseline - warm) / args.requests * 1000
+            print(f'{"":>10}  saved {saved:.2f} ms per request ({baseline / warm:.1f}x), '
+                  f'pool {pool.stats()}')
+        finally:
+            pool.close()
+            if server:
+                server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@ import random
 import json
 import os
 from typing import Dict, Any, Optional
-from http.cookiejar import MozillaCookieJar
+from cookie_store import get_cookie_store, load_jar
 
 class BrowserEmulator:
     def __init__(self, user_cookies: Optional[str] = None):
@@ -54,37 +54,34 @@ class BrowserEmulator:
         }
         
         self.cookie_file = os.path.join(os.path.dirname(__file__), 'cookies.txt')
+        self._cookie_store = None
         if user_cookies:
             self._save_user_cookies(user_cookies)
         self._load_cookies()
 
     def _save_user_cookies(self, cookies_str: str) -> None:
-        """Save user provided cookies to file"""
+        """Point at the shared file for these cookies, writing it only if it is new"""
         try:
-            # Create a temporary file with user cookies
-            temp_cookie_file = os.path.join(os.path.dirname(__file__), f'user_cookies_{random.randint(1000, 9999)}.txt')
-            with open(temp_cookie_file, 'w') as f:
-                f.write(cookies_str)
-            
-            # Update cookie file path
-            self.cookie_file = temp_cookie_file
+            store = get_cookie_store()
+            cookie_file = store.save(cookies_str)
+            # Held until cleanup() so the store doesn't purge it mid-download
+            store.acquire(cookie_file)
+            self._cookie_store = store
+            self.cookie_file = cookie_file
         except Exception as e:
             print(f"Error saving user cookies: {e}")
 
     def _load_cookies(self):
-        """Load cookies from file if it exists"""
-        self.cookies = MozillaCookieJar(self.cookie_file)
-        if os.path.exists(self.cookie_file):
-            try:
-                self.cookies.load(ignore_discard=True, ignore_expires=True)
-            except Exception as e:
-                print(f"Error loading cookies: {e}")
+        """Load cookies from file if it exists; parsed once per file version and shared"""
+        self.cookies = load_jar(self.cookie_file)
 
     def cleanup(self):
-        """Clean up temporary cookie files"""
+        """Release the user cookie file; other emulators may share it, so the store deletes it once idle"""
         try:
-            if os.path.exists(self.cookie_file) and 'user_cookies_' in self.cookie_file:
-                os.remove(self.cookie_file)
+            if self._cookie_store is not None:
+                self._cookie_store.release(self.cookie_file)
+                self._cookie_store.purge()
+                self._cookie_store = None
         except Exception as e:
             print(f"Error cleaning up cookies: {e}")
 
@@ -125,8 +122,6 @@ class BrowserEmulator:
             'retries': 5,
             'nocheckcertificate': True,
             'cookiefile': self.cookie_file if os.path.exists(self.cookie_file) else None,
-            'sleep_interval': random.randint(1, 3),  # Random delay between requests
-            'max_sleep_interval': 5,
             'geo_bypass': True,
             'geo_bypass_country': 'US'
         }
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PENDING = 'pending'
+DOWNLOADING = 'downloading'
+COMPLETED = 'completed'
+ERROR = 'error'
+
+
+class BulkManifest:
+    """Record of a bulk download run, kept as a SQLite file in the downloads folder
+
+    Every link gets a number the first time it is seen and keeps it across
+    runs, so an interrupted or partly failed batch can simply be run again:
+    finished links are skipped and the rest download to the same {number}
+    file, where yt-dlp picks up any partial data.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # One CLI process; worker threads share the connection under the lock
+        self._conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            'link TEXT PRIMARY KEY, number INTEGER NOT NULL UNIQUE, platform TEXT NOT NULL, '
+            'status TEXT NOT NULL, output_path TEXT, size INTEGER, error TEXT, '
+            'attempts INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)'
+        )
+
+    def plan(self, items: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Register (link, platform) pairs and return their rows in input order
+
+        New links are numbered after every link already in the manifest;
+        repeated links appear once.
+        """
+        with self._lock:
+            known = {row['link']: row for row in self._rows('SELECT * FROM items')}
+            next_number = max((row['number'] for row in known.values()), default=0) + 1
+            planned: Dict[str, Dict[str, Any]] = {}
+            new_rows = []
+            now = time.time()
+            for link, platform in items:
+                if link in planned:
+                    continue
+                row = known.get(link)
+                if row is None:
+                    row = {'link': link, 'number': next_number, 'platform': platform, 'status': PENDING,
+                           'output_path': None, 'size': None, 'error': None, 'attempts': 0, 'updated_at': now}
+                    new_rows.append(row)
+                    next_number += 1
+                planned[link] = row
+            self._conn.execute('BEGIN')
+            self._conn.executemany(
+                'INSERT INTO items (link, number, platform, status, attempts, updated_at) '
+                'VALUES (:link, :number, :platform, :status, :attempts, :updated_at)', new_rows
+            )
+            self._conn.execute('COMMIT')
+            return list(planned.values())
+
+    def is_done(self, row: Dict[str, Any]) -> bool:
+        """Completed, and the file is still there at the recorded size"""
+        path = row.get('output_path')
+        return (row['status'] == COMPLETED and path is not None and os.path.exists(path)
+                and os.path.getsize(path) == row['size'])
+
+    def start(self, link: str) -> None:
+        self._update(link, status=DOWNLOADING, error=None, increment=True)
+
+    def complete(self, link: str, output_path: str, size: Optional[int] = None) -> None:
+        if size is None:
+            size = os.path.getsize(output_path)
+        self._update(link, status=COMPLETED, output_path=output_path, size=size)
+
+    def fail(self, link: str, error: Optional[str]) -> None:
+        self._update(link, status=ERROR, error=error or 'Download failed')
+
+    def _update(self, link: str, increment: bool = False, **fields) -> None:
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        if increment:
+            assignments += ', attempts = attempts + 1'
+        with self._lock:
+            self._conn.execute(
+                f'UPDATE items SET {assignments}, updated_at = ? WHERE link = ?',
+                (*fields.values(), time.time(), link)
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute('SELECT status, COUNT(*) FROM items GROUP BY status').fetchall())
+
+    def _rows(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        cursor = self._conn.execute(query, params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, values)) for values in cursor.fetchall()]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
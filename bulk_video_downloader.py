@@ -1,11 +1,73 @@
+import argparse
+import glob
+import json
 import os
+import queue
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from tqdm import tqdm
-import yt_dlp
 import instaloader
 from urllib.parse import urlparse, parse_qs
 from browser_emulator import BrowserEmulator
+from bulk_manifest import BulkManifest
 from proxy_manager import ProxyManager
+from rate_limiter import get_host_rate_limiter
+from ytdl_pool import get_ytdl_pool
+
+_proxy_manager = None
+_instaloader = None
+_instaloader_lock = threading.Lock()
+
+# Default downloads allowed at once per platform in --jobs mode; Instagram
+# rate-limits far sooner than YouTube
+PLATFORM_JOBS = {'youtube': 4, 'instagram': 2}
+
+def get_proxy_manager():
+    """One proxy pool per run, so its health checks carry over between videos"""
+    global _proxy_manager
+    if _proxy_manager is None:
+        _proxy_manager = ProxyManager()
+    return _proxy_manager
+
+class SharedRateController(instaloader.RateController):
+    """Instaloader's rate limiting, made safe for several threads sharing one context
+
+    Every query's wait is computed from the same request history, so parallel
+    workers together stay within the limits a single Instaloader would keep,
+    and a 429 pauses all of them.
+    """
+    def __init__(self, context):
+        super().__init__(context)
+        self._lock = threading.Lock()
+
+    def wait_before_query(self, query_type):
+        with self._lock:
+            super().wait_before_query(query_type)
+
+    def handle_429(self, query_type):
+        with self._lock:
+            super().handle_429(query_type)
+
+def get_instaloader():
+    """One Instaloader session per run, shared by every Instagram download"""
+    global _instaloader
+    with _instaloader_lock:
+        if _instaloader is None:
+            _instaloader = instaloader.Instaloader(
+                quiet=True, rate_controller=lambda context: SharedRateController(context)
+            )
+        return _instaloader
+
+def instagram_shortcode(link):
+    """Shortcode from /p/<code>/, /reel/<code>/ or /tv/<code>/ links, with or without a trailing slash"""
+    parts = [part for part in urlparse(link).path.split('/') if part]
+    for marker in ('p', 'reel', 'reels', 'tv'):
+        if marker in parts[:-1]:
+            return parts[parts.index(marker) + 1]
+    return parts[-1]
 
 def create_download_folder():
     download_dir = os.path.join(os.getcwd(), 'downloads')
@@ -24,12 +86,20 @@ class DownloadLogger:
     def error(self, msg):
         print(f"Error: {msg}")
 
-def download_youtube_video(link, index, download_dir, user_cookies=None):
+class QuietLogger(DownloadLogger):
+    """Leaves the terminal to the progress bars; errors still go through tqdm.write"""
+    def debug(self, msg):
+        pass
+
+    def error(self, msg):
+        tqdm.write(f"Error: {msg}")
+
+def download_youtube_video(link, index, download_dir, user_cookies=None, progress_hook=None, on_error=None):
     browser = None
     try:
         # Initialize browser emulator and proxy manager
         browser = BrowserEmulator(user_cookies)
-        proxy_manager = ProxyManager()
+        proxy_manager = get_proxy_manager()
         
         # Get yt-dlp options with browser emulation
         ydl_opts = browser.get_yt_dlp_options()
@@ -42,96 +112,215 @@ def download_youtube_video(link, index, download_dir, user_cookies=None):
             'progress_hooks': [lambda d: print(f'\rDownloading... {d["_percent_str"]}', end='') 
                              if d['status'] == 'downloading' else None],
         })
+        # Parallel jobs share one pace per host, which backs off when YouTube pushes back
+        rate_limiter = get_host_rate_limiter()
+        retry_delay = rate_limiter.bucket(link).retry_delay
+        ydl_opts['retry_sleep_functions'] = {'http': retry_delay, 'fragment': retry_delay}
+        if progress_hook:
+            ydl_opts.update({'logger': QuietLogger(), 'progress_hooks': [progress_hook]})
         
         # Try with different proxies until success
         max_retries = 3
         for attempt in range(max_retries):
+            proxy = None
             try:
                 proxy = proxy_manager.get_proxy()
                 if proxy:
                     ydl_opts['proxy'] = proxy['http']
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                rate_limiter.acquire(link)
+                with get_ytdl_pool().borrow(ydl_opts) as ydl:
                     info = ydl.extract_info(link, download=True)
-                    print(f'\nDownloaded YouTube video: {index}.mp4')
+                    rate_limiter.record_success(link)
+                    if proxy:
+                        proxy_manager.record_result(proxy)
+                    if not progress_hook:
+                        print(f'\nDownloaded YouTube video: {index}.mp4')
                     return True
                     
             except Exception as e:
+                rate_limiter.record_error(link, str(e))
                 if proxy:
-                    proxy_manager.remove_proxy(proxy)
+                    # Counts toward the proxy's circuit breaker only if the proxy is to blame
+                    proxy_manager.record_result(proxy, str(e))
                 if attempt == max_retries - 1:
                     raise e
-                print(f'\nRetrying with different proxy... (Attempt {attempt + 2}/{max_retries})')
+                tqdm.write(f'\nRetrying {link} with different proxy... (Attempt {attempt + 2}/{max_retries})')
                 continue
                 
     except Exception as e:
-        print(f'\nError downloading YouTube video: {e}')
+        tqdm.write(f'\nError downloading YouTube video {link}: {e}')
+        if on_error:
+            on_error(str(e))
         return False
     finally:
         if browser:
             browser.cleanup()
 
-def download_youtube_playlist(playlist_url, start_index, download_dir, user_cookies=None):
-    browser = None
+def read_archive(archive_path):
+    """IDs recorded in a yt-dlp style download archive ("<extractor> <id>" per line)"""
     try:
-        # Initialize browser emulator and proxy manager
-        browser = BrowserEmulator(user_cookies)
-        proxy_manager = ProxyManager()
-        
-        # Get yt-dlp options
-        ydl_opts = browser.get_yt_dlp_options()
-        ydl_opts.update({
-            'outtmpl': os.path.join(download_dir, f'%(playlist_index)d.%(ext)s'),
-            'format': 'best[ext=mp4]',
-            'logger': DownloadLogger(),
-            'playliststart': start_index,
-        })
-        
-        proxy = proxy_manager.get_proxy()
-        if proxy:
-            ydl_opts['proxy'] = proxy['http']
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(playlist_url, download=True)
-            videos = info['entries']
-            success_count = len([v for v in videos if v is not None])
-            print(f'\nSuccessfully downloaded {success_count} videos from playlist')
-            return start_index + len(videos)
-            
-    except Exception as e:
-        print(f'\nError processing playlist: {e}')
-        return start_index
-    finally:
-        if browser:
-            browser.cleanup()
+        with open(archive_path) as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
 
-def download_instagram_video(link, index, download_dir):
+def read_owners(download_dir):
+    """Which video (archive ID) each file number in a playlist folder belongs to"""
     try:
-        L = instaloader.Instaloader()
-        # Extract post shortcode from URL
-        parsed_url = urlparse(link)
-        shortcode = parsed_url.path.split('/')[-2]
-        
-        post = instaloader.Post.from_shortcode(L.context, shortcode)
+        with open(os.path.join(download_dir, 'files.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def write_owners(download_dir, owners):
+    path = os.path.join(download_dir, 'files.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(owners, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def stem_files(download_dir, stem):
+    """Every file for a number, partial downloads included"""
+    return glob.glob(os.path.join(download_dir, f'{stem}.*'))
+
+def set_aside(download_dir, stem, owner=None):
+    """Move a number's files to replaced/ so another video can take the number"""
+    files = stem_files(download_dir, stem)
+    if not files:
+        return
+    replaced = os.path.join(download_dir, 'replaced')
+    os.makedirs(replaced, exist_ok=True)
+    tag = owner.split(' ')[-1] if owner else f'unknown-{int(time.time())}'
+    for path in files:
+        name = os.path.basename(path)
+        os.replace(path, os.path.join(replaced, f'{tag}-{stem}{name[len(stem):]}'))
+
+def reconcile_playlist_folder(download_dir, entries, owners):
+    """Move files to the numbers their videos have now; returns the updated owners
+
+    Playlists gain entries at the top and get reordered, so a video's
+    playlist_index changes between syncs. Files of videos that moved are
+    renamed to their new number (through temporary names, so swaps work);
+    files of videos that left the playlist are set aside only when their
+    number is now needed. Files in folders synced before files.json existed
+    belong to no known video, so their entries download once more and the
+    old files are set aside.
+    """
+    desired = {entry['archive_id']: str(entry['playlist_index']) for entry in entries}
+    wanted = set(desired.values())
+    moves = []
+    for stem, owner in list(owners.items()):
+        target = desired.get(owner)
+        if target == stem:
+            continue
+        del owners[stem]
+        if target is None:
+            if stem in wanted:
+                set_aside(download_dir, stem, owner)
+            continue
+        for path in stem_files(download_dir, stem):
+            name = os.path.basename(path)
+            os.replace(path, os.path.join(download_dir, f'.moving-{stem}{name[len(stem):]}'))
+        moves.append((stem, target, owner))
+    for stem, target, owner in moves:
+        # Whatever is still at the new number belongs to no known video
+        set_aside(download_dir, target)
+        prefix = f'.moving-{stem}'
+        for path in glob.glob(os.path.join(download_dir, prefix + '.*')):
+            os.replace(path, os.path.join(download_dir, target + os.path.basename(path)[len(prefix):]))
+        owners[target] = owner
+    return owners
+
+def download_youtube_playlist(playlist_url, download_dir, user_cookies=None, max_workers=4, bar=None, slot=None):
+    """Sync a playlist into download_dir as {playlist_index}.mp4
+
+    Phase one lists the entries with a flat extraction; phase two downloads
+    the ones not yet in download_dir/archive.txt in parallel, each with its
+    own proxy and retries, so one bad proxy only costs a single entry.
+    Entries are appended to the archive once their own file is written, so
+    syncing the same playlist again only fetches new or previously failed
+    entries. download_dir/files.json records which video owns each number;
+    see reconcile_playlist_folder for what happens when indexes shift. If given,
+    bar is a tqdm bar advanced once per entry, and slot returns a context
+    manager held around the listing and each entry's download, so the
+    caller's concurrency limits cover playlist entries too.
+
+    Returns counts of total, skipped, downloaded and failed entries.
+    """
+    slot = slot or nullcontext
+    os.makedirs(download_dir, exist_ok=True)
+    archive_path = os.path.join(download_dir, 'archive.txt')
+    with slot():
+        entries = list_playlist_entries(playlist_url, user_cookies)
+    # A video listed twice is kept once, at its first position
+    seen = set()
+    entries = [entry for entry in entries if not (entry['archive_id'] in seen or seen.add(entry['archive_id']))]
+    archived = read_archive(archive_path)
+    owners = reconcile_playlist_folder(download_dir, entries, read_owners(download_dir))
+    write_owners(download_dir, owners)
+    pending = [
+        entry for entry in entries
+        if not (entry['archive_id'] in archived and owners.get(str(entry['playlist_index'])) == entry['archive_id']
+                and find_output(download_dir, entry['playlist_index']))
+    ]
+    summary = {'total': len(entries), 'skipped': len(entries) - len(pending), 'downloaded': 0, 'failed': 0}
+    if bar is not None:
+        bar.reset(total=len(pending))
+    else:
+        print(f'Playlist has {len(entries)} videos, {len(pending)} to download')
+    lock = threading.Lock()
+
+    def fetch(entry):
+        stem = str(entry['playlist_index'])
+        with lock:
+            # Never let yt-dlp find another video's file (or partial) under this number
+            if owners.get(stem) != entry['archive_id']:
+                set_aside(download_dir, stem, owners.get(stem))
+                owners[stem] = entry['archive_id']
+                write_owners(download_dir, owners)
+        # No per-entry progress output; it would interleave between workers
+        with slot():
+            ok = download_youtube_video(entry['url'], entry['playlist_index'], download_dir, user_cookies,
+                                        progress_hook=lambda d: None)
+        ok = bool(ok and find_output(download_dir, stem))
+        with lock:
+            if ok:
+                with open(archive_path, 'a') as f:
+                    f.write(entry['archive_id'] + '\n')
+                summary['downloaded'] += 1
+            else:
+                summary['failed'] += 1
+            if bar is not None:
+                bar.update(1)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='playlist') as executor:
+        list(executor.map(fetch, pending))
+    if bar is None:
+        print(f'\nSuccessfully downloaded {summary["downloaded"]} videos from playlist '
+              f'({summary["skipped"]} already there, {summary["failed"]} failed)')
+    return summary
+
+def download_instagram_video(link, index, download_dir, quiet=False, on_error=None):
+    try:
+        L = get_instaloader()
+        post = instaloader.Post.from_shortcode(L.context, instagram_shortcode(link))
         if not post.is_video:
-            print(f'\nError: The Instagram post {index} is not a video')
+            tqdm.write(f'\nError: The Instagram post {index} is not a video')
+            if on_error:
+                on_error('Post is not a video')
             return False
             
-        print(f'\nDownloading Instagram video {index}...')
-        output_path = os.path.join(download_dir, f'{index}.mp4')
-        L.download_post(post, target=os.path.dirname(output_path))
-        
-        # Rename the downloaded file to our index-based naming
-        downloaded_files = [f for f in os.listdir(os.path.dirname(output_path)) if f.endswith('.mp4')]
-        if downloaded_files:
-            os.rename(
-                os.path.join(os.path.dirname(output_path), downloaded_files[0]),
-                output_path
-            )
-        print(f'Downloaded Instagram video: {index}.mp4')
+        if not quiet:
+            print(f'\nDownloading Instagram video {index}...')
+        # Written straight to {index}.mp4 (the extension comes from the response)
+        L.download_pic(os.path.join(download_dir, str(index)), post.video_url, post.date_local)
+        if not quiet:
+            print(f'Downloaded Instagram video: {index}.mp4')
         return True
     except Exception as e:
-        print(f'\nError downloading Instagram video: {e}')
+        tqdm.write(f'\nError downloading Instagram video {link}: {e}')
+        if on_error:
+            on_error(str(e))
         return False
 
 def validate_url(url):
@@ -141,41 +330,266 @@ def validate_url(url):
     except:
         return False
 
-def main():
-    download_dir = create_download_folder()
-    print("Welcome to Bulk Video Downloader!")
-    print("Enter video links separated by commas")
-    print("Supported formats:")
-    print("- YouTube videos: https://youtube.com/watch?v=...")
-    print("- YouTube shorts: https://youtube.com/shorts/...")
-    print("- YouTube playlists: https://youtube.com/playlist?list=...")
-    print("- Instagram posts: https://instagram.com/p/...")
-    
-    print("\nOptional: Paste your YouTube cookies to improve download success rate")
-    print("(You can get cookies using browser extensions like 'Get cookies.txt')")
-    user_cookies = input("Enter cookies (or press Enter to skip): ").strip()
-    
-    links = input('\nEnter links: ').split(',')
-    index = 1
-    
+def get_platform(link):
+    if 'youtube.com' in link or 'youtu.be' in link:
+        return 'youtube'
+    if 'instagram.com' in link:
+        return 'instagram'
+    return None
+
+def list_playlist_entries(playlist_url, user_cookies=None):
+    """Playlist entries from a flat extraction that downloads nothing
+
+    Each entry has its 1-based playlist_index, url and archive_id (the line
+    yt-dlp would write to a download archive).
+    """
+    browser = BrowserEmulator(user_cookies)
+    try:
+        ydl_opts = browser.get_yt_dlp_options()
+        ydl_opts.update({'extract_flat': 'in_playlist', 'logger': QuietLogger()})
+        proxy = get_proxy_manager().get_proxy()
+        if proxy:
+            ydl_opts['proxy'] = proxy['http']
+        get_host_rate_limiter().acquire(playlist_url)
+        with get_ytdl_pool().borrow(ydl_opts) as ydl:
+            info = ydl.extract_info(playlist_url, download=False)
+        entries = []
+        for position, entry in enumerate(info.get('entries') or [], start=1):
+            if not entry:
+                continue
+            url = entry.get('url') or entry.get('webpage_url')
+            ie_key = entry.get('ie_key') or info.get('extractor_key') or 'generic'
+            entries.append({
+                'playlist_index': entry.get('playlist_index') or position,
+                'url': url,
+                'archive_id': f"{ie_key.lower()} {entry.get('id') or url}"
+            })
+        return entries
+    finally:
+        browser.cleanup()
+
+def plan_jobs(links):
+    """(link, platform) for every link to download, in input order
+
+    A YouTube playlist is one job of platform 'playlist'; it fans out to its
+    own workers when it runs.
+    """
+    jobs = []
     for link in links:
         link = link.strip()
         if not validate_url(link):
             print(f'\nInvalid URL format: {link}')
             continue
-            
-        if 'youtube.com' in link or 'youtu.be' in link:
-            if 'playlist' in link:
-                index = download_youtube_playlist(link, index, download_dir, user_cookies)
-            else:
-                if download_youtube_video(link, index, download_dir, user_cookies):
-                    index += 1
-        elif 'instagram.com' in link:
-            if download_instagram_video(link, index, download_dir):
-                index += 1
-        else:
+        platform = get_platform(link)
+        if platform is None:
             print(f'\nUnsupported platform: {link}')
-    
+            continue
+        if platform == 'youtube' and 'playlist' in link:
+            platform = 'playlist'
+        jobs.append((link, platform))
+    return jobs
+
+def read_links(source):
+    """Links from a file or stdin ('-'): one per line or comma-separated; '#' starts a comment line"""
+    f = sys.stdin if source == '-' else open(source)
+    try:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            for link in line.split(','):
+                if link.strip():
+                    yield link.strip()
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def find_output(download_dir, index):
+    """The finished file for a job number, ignoring partial downloads"""
+    for path in glob.glob(os.path.join(download_dir, f'{index}.*')):
+        if not path.endswith(('.part', '.ytdl')):
+            return path
+    return None
+
+def output_size(path):
+    """Bytes in a downloaded file, or in a synced playlist folder"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+def run_parallel(jobs, download_dir, user_cookies, max_jobs, platform_jobs, manifest):
+    """Download manifest rows concurrently: at most max_jobs overall and platform_jobs[p] per platform
+
+    Each platform gets its own worker threads, so a long queue of YouTube
+    links never holds up Instagram ones. Every download holds a slot of its
+    platform and then one of the overall limit. A playlist syncs into the
+    folder {number}/ and its entries take YouTube slots like any other
+    YouTube link, so with max_jobs 1 they too download one at a time. Every
+    start, success and failure is written to the manifest.
+    """
+    overall = threading.BoundedSemaphore(max_jobs)
+    # Playlists only get an executor: their entries take YouTube slots instead
+    platform_slots = {platform: threading.BoundedSemaphore(max(1, min(max_jobs, limit)))
+                      for platform, limit in platform_jobs.items() if platform != 'playlist'}
+
+    @contextmanager
+    def slot(platform):
+        # Platform first, then overall, in the same order everywhere
+        with platform_slots[platform], overall:
+            yield
+
+    # Terminal rows for the bars, reused as jobs finish; row max_jobs is the playlist's
+    positions = queue.Queue()
+    for position in range(max_jobs):
+        positions.put(position)
+    overall_bar = tqdm(total=len(jobs), desc='Videos', unit='video', position=max_jobs + 1, leave=True)
+    lock = threading.Lock()
+    results = {}
+
+    def run_playlist(job):
+        # Holds no slot itself: the listing and every entry take YouTube slots
+        index, link = job['number'], job['link']
+        bar = tqdm(desc=f'{index}', unit='video', position=max_jobs, leave=False)
+        errors = []
+        try:
+            manifest.start(link)
+            path = os.path.join(download_dir, str(index))
+            try:
+                summary = download_youtube_playlist(link, path, user_cookies, platform_jobs.get('youtube', 1),
+                                                    bar=bar, slot=lambda: slot('youtube'))
+                if summary['failed']:
+                    errors.append(f"{summary['failed']} of {summary['total']} videos failed")
+            except Exception as e:
+                tqdm.write(f'\nError processing playlist {link}: {e}')
+                errors.append(str(e))
+            ok = not errors
+            if ok:
+                manifest.complete(link, path, output_size(path))
+            else:
+                manifest.fail(link, errors[-1])
+            with lock:
+                results[index] = path if ok else None
+                overall_bar.update(1)
+        finally:
+            bar.close()
+
+    def run(job):
+        index, platform, link = job['number'], job['platform'], job['link']
+        if platform == 'playlist':
+            run_playlist(job)
+            return
+        with slot(platform):
+            position = positions.get()
+            bar = tqdm(desc=f'{index}', unit='B', unit_scale=True, unit_divisor=1024,
+                       position=position, leave=False)
+            errors = []
+            try:
+                def hook(d):
+                    if d['status'] == 'downloading':
+                        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                        if total and bar.total != total:
+                            bar.total = total
+                        bar.update(d.get('downloaded_bytes', 0) - bar.n)
+
+                manifest.start(link)
+                if platform == 'youtube':
+                    ok = download_youtube_video(link, index, download_dir, user_cookies,
+                                                progress_hook=hook, on_error=errors.append)
+                else:
+                    ok = download_instagram_video(link, index, download_dir, quiet=True, on_error=errors.append)
+                path = find_output(download_dir, index) if ok else None
+                if path:
+                    manifest.complete(link, path)
+                else:
+                    manifest.fail(link, errors[-1] if errors else None)
+                with lock:
+                    results[index] = path
+                    overall_bar.update(1)
+            finally:
+                bar.close()
+                positions.put(position)
+
+    started = time.monotonic()
+    executors = {
+        platform: ThreadPoolExecutor(max_workers=max(1, min(max_jobs, limit)), thread_name_prefix=platform)
+        for platform, limit in platform_jobs.items()
+    }
+    try:
+        futures = [executors[job['platform']].submit(run, job) for job in jobs]
+        for future in futures:
+            future.result()
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
+        overall_bar.close()
+    elapsed = time.monotonic() - started
+
+    done = [path for path in results.values() if path]
+    total_bytes = sum(output_size(path) for path in done)
+    print(f'\nDownloaded {len(done)} of {len(jobs)} videos, {total_bytes / (1024 * 1024):.1f} MB '
+          f'in {elapsed:.1f}s ({total_bytes / (1024 * 1024) / max(elapsed, 0.001):.2f} MB/s, '
+          f'{len(done) / max(elapsed, 0.001) * 60:.1f} videos/min)')
+    failed = [job['link'] for job in jobs if not results.get(job['number'])]
+    for link in failed:
+        print(f'Failed: {link}')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Download YouTube and Instagram videos in bulk')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Videos downloaded at once (default 1: one after another)')
+    parser.add_argument('--youtube-jobs', type=int, default=PLATFORM_JOBS['youtube'],
+                        help='Most YouTube downloads at once in --jobs mode')
+    parser.add_argument('--instagram-jobs', type=int, default=PLATFORM_JOBS['instagram'],
+                        help='Most Instagram downloads at once in --jobs mode')
+    parser.add_argument('--input', metavar='FILE',
+                        help="Read links from FILE ('-' for stdin), one per line, instead of prompting")
+    parser.add_argument('--cookies', metavar='FILE', help='Netscape cookies file to use for YouTube')
+    parser.add_argument('--manifest', metavar='PATH',
+                        help='Manifest database (default: downloads/manifest.sqlite3)')
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    download_dir = create_download_folder()
+    user_cookies = None
+    if args.cookies:
+        with open(args.cookies) as f:
+            user_cookies = f.read()
+
+    if args.input:
+        links = list(read_links(args.input))
+    else:
+        print("Welcome to Bulk Video Downloader!")
+        print("Enter video links separated by commas")
+        print("Supported formats:")
+        print("- YouTube videos: https://youtube.com/watch?v=...")
+        print("- YouTube shorts: https://youtube.com/shorts/...")
+        print("- YouTube playlists: https://youtube.com/playlist?list=...")
+        print("- Instagram posts: https://instagram.com/p/...")
+
+        if user_cookies is None:
+            print("\nOptional: Paste your YouTube cookies to improve download success rate")
+            print("(You can get cookies using browser extensions like 'Get cookies.txt')")
+            user_cookies = input("Enter cookies (or press Enter to skip): ").strip()
+
+        links = input('\nEnter links: ').split(',')
+
+    manifest = BulkManifest(args.manifest or os.path.join(download_dir, 'manifest.sqlite3'))
+    try:
+        rows = manifest.plan(plan_jobs(links))
+        # Playlists always sync: their archive skips what is already there and picks up new videos
+        jobs = [row for row in rows if row['platform'] == 'playlist' or not manifest.is_done(row)]
+        if len(jobs) < len(rows):
+            print(f'Skipping {len(rows) - len(jobs)} videos already downloaded')
+        if jobs:
+            run_parallel(jobs, download_dir, user_cookies or None, max(1, args.jobs),
+                         {'youtube': args.youtube_jobs, 'instagram': args.instagram_jobs, 'playlist': 1},
+                         manifest)
+    finally:
+        manifest.close()
+        # Closes pooled yt-dlp instances and their connections
+        get_ytdl_pool().close()
+
     print('\nAll downloads completed!')
     print(f'Videos are saved in the "downloads" folder')
 
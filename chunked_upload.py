@@ -0,0 +1,130 @@
+import fcntl
+import json
+import os
+import secrets
+import time
+from typing import Any, BinaryIO, Dict, Optional
+
+# Bytes copied from the request body per write; at most this much of a chunk
+# is lost when the connection drops mid-read
+COPY_BUFFER = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised for requests that don't fit the upload's state; carries an HTTP status"""
+
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class ChunkedUploads:
+    """Resumable uploads written to disk one chunk at a time
+
+    Each upload is a .part file plus a JSON sidecar holding the declared name
+    and size. The .part file's length is the committed offset, so state
+    survives restarts and is shared by every worker process. A client that
+    loses its connection asks for the offset and resends from there.
+    """
+
+    def __init__(self, folder: str, max_size: int, max_age: float = 86400):
+        self.folder = folder
+        self.max_size = max_size
+        self.max_age = max_age
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, upload_id: str, suffix: str) -> str:
+        if not upload_id or not all(c.isalnum() or c in '-_' for c in upload_id):
+            raise UploadError('Unknown upload', 404)
+        return os.path.join(self.folder, f'chunked_{upload_id}{suffix}')
+
+    def create(self, filename: str, size: int) -> str:
+        """Start an upload of size bytes and return its ID"""
+        if size <= 0:
+            raise UploadError('Upload size must be positive')
+        if size > self.max_size:
+            raise UploadError(f'File exceeds the {self.max_size // (1024 * 1024)}MB limit', 413)
+        upload_id = secrets.token_urlsafe(16)
+        open(self._path(upload_id, '.part'), 'wb').close()
+        with open(self._path(upload_id, '.json'), 'w') as f:
+            json.dump({'filename': filename, 'size': size, 'created_at': time.time()}, f)
+        return upload_id
+
+    def get(self, upload_id: str) -> Dict[str, Any]:
+        """Declared name and size plus the number of bytes received so far"""
+        try:
+            with open(self._path(upload_id, '.json')) as f:
+                state = json.load(f)
+            state['offset'] = os.path.getsize(self._path(upload_id, '.part'))
+        except (OSError, ValueError):
+            raise UploadError('Unknown upload', 404)
+        return state
+
+    def write(self, upload_id: str, offset: int, stream: BinaryIO, length: Optional[int]) -> int:
+        """Append a chunk that starts at offset and return the new offset
+
+        The offset must equal the bytes already received, which rejects
+        duplicated or out-of-order chunks. Data is written as it arrives, so a
+        dropped connection keeps everything read before it.
+        """
+        state = self.get(upload_id)
+        part_path = self._path(upload_id, '.part')
+        with open(part_path, 'r+b') as f:
+            try:
+                # One writer per upload, across threads and processes
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError('Another chunk is being written', 409, state['offset'])
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise UploadError('Offset does not match the bytes received', 409, current)
+            if length is not None and current + length > state['size']:
+                raise UploadError('Chunk runs past the declared size', 413, current)
+            f.seek(current)
+            while current < state['size']:
+                data = stream.read(min(COPY_BUFFER, state['size'] - current))
+                if not data:
+                    break
+                f.write(data)
+                current += len(data)
+            f.flush()
+            return current
+
+    def complete(self, upload_id: str, output_path: str) -> Dict[str, Any]:
+        """Move a fully received upload to output_path
+
+        The session is kept until the caller hands the file off: delete() it
+        then, or restore() the file if that fails so the upload can be completed again.
+        """
+        state = self.get(upload_id)
+        if state['offset'] != state['size']:
+            raise UploadError('Upload is incomplete', 409, state['offset'])
+        os.replace(self._path(upload_id, '.part'), output_path)
+        return state
+
+    def restore(self, upload_id: str, output_path: str) -> None:
+        """Put a file moved out by complete() back into its session"""
+        os.replace(output_path, self._path(upload_id, '.part'))
+
+    def delete(self, upload_id: str) -> None:
+        for suffix in ('.part', '.json'):
+            try:
+                os.remove(self._path(upload_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def purge(self) -> int:
+        """Remove uploads that were started more than max_age seconds ago"""
+        removed = 0
+        cutoff = time.time() - self.max_age
+        for name in os.listdir(self.folder):
+            if name.startswith('chunked_') and name.endswith('.json'):
+                upload_id = name[len('chunked_'):-len('.json')]
+                try:
+                    if self.get(upload_id)['created_at'] < cutoff:
+                        self.delete(upload_id)
+                        removed += 1
+                except UploadError:
+                    self.delete(upload_id)
+        return removed
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.cookiejar import MozillaCookieJar
+from typing import Dict, Iterator, Optional, Tuple
+
+NETSCAPE_HEADER = '# Netscape HTTP Cookie File'
+
+
+def normalize_cookies(cookies_str: str) -> str:
+    """Cookie text as written to disk: trimmed, with the header MozillaCookieJar expects"""
+    cookies_str = cookies_str.strip()
+    if not cookies_str.startswith(NETSCAPE_HEADER):
+        cookies_str = f'{NETSCAPE_HEADER}\n{cookies_str}'
+    return cookies_str + '\n'
+
+
+def cookie_digest(cookies_str: str) -> str:
+    """Stable identifier for cookie text, equal for texts that normalize the same"""
+    return hashlib.sha256(normalize_cookies(cookies_str).encode()).hexdigest()[:32]
+
+
+# Parsed jars by path, reused until the file changes
+_jars: Dict[str, Tuple[Tuple[int, int], MozillaCookieJar]] = {}
+_jars_lock = threading.Lock()
+
+
+def load_jar(path: str) -> MozillaCookieJar:
+    """Parse a cookies.txt file once and share the jar until the file's mtime or size changes
+
+    The jar is shared between callers and must be treated as read-only.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return MozillaCookieJar(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _jars_lock:
+        cached = _jars.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+    jar = MozillaCookieJar(path)
+    try:
+        jar.load(ignore_discard=True, ignore_expires=True)
+    except Exception as e:
+        print(f"Error loading cookies: {e}")
+    with _jars_lock:
+        _jars[path] = (version, jar)
+    return jar
+
+
+class CookieStore:
+    """One cookies file per distinct cookie text, shared by every request that sends it
+
+    Files are named after a hash of their content, so a repeat of the same
+    cookies reuses the existing file without writing or parsing anything.
+    While yt-dlp may read a file, hold() keeps a reference to it; purge()
+    only removes files nobody in this process holds and that have not been
+    used for max_idle seconds. Use keeps the file's mtime fresh (at most
+    every touch_interval seconds) so other processes sharing the folder
+    don't purge it either.
+
+    Because the name is the content's hash, the files are read-only: yt-dlp
+    must not save its cookie jar back to them (ytdl_pool closes instances
+    without saving when owns() is true), or the name would stop matching.
+    """
+
+    def __init__(self, folder: str, max_idle: float = 3600, touch_interval: float = 300):
+        self.folder = folder
+        self.max_idle = max_idle
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        # path -> [references, last touched]
+        self._entries: Dict[str, list] = {}
+        os.makedirs(folder, exist_ok=True)
+
+    def path_for(self, cookies_str: str) -> str:
+        return os.path.join(self.folder, f'user_cookies_{cookie_digest(cookies_str)}.txt')
+
+    def owns(self, path: str) -> bool:
+        """Whether path is one of this store's content-addressed files"""
+        name = os.path.basename(path)
+        return (os.path.dirname(os.path.abspath(path)) == self.folder
+                and name.startswith('user_cookies_') and name.endswith('.txt'))
+
+    def save(self, cookies_str: str) -> str:
+        """Path of the file holding these cookies, written only if it doesn't exist yet"""
+        path = self.path_for(cookies_str)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.setdefault(path, [0, 0.0])
+            if not os.path.exists(path):
+                tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'w') as f:
+                    f.write(normalize_cookies(cookies_str))
+                os.replace(tmp_path, path)
+                entry[1] = now
+            elif now - entry[1] > self.touch_interval:
+                os.utime(path)
+                entry[1] = now
+        return path
+
+    def acquire(self, path: str) -> None:
+        with self._lock:
+            self._entries.setdefault(path, [0, time.time()])[0] += 1
+
+    def release(self, path: str) -> None:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] > 0:
+                entry[0] -= 1
+
+    @contextmanager
+    def hold(self, path: Optional[str]) -> Iterator[None]:
+        """Keep purge() away from path for the duration of the block; None is a no-op"""
+        if path is None:
+            yield
+            return
+        self.acquire(path)
+        try:
+            yield
+        finally:
+            self.release(path)
+
+    def jar(self, cookies_str: str) -> MozillaCookieJar:
+        """Parsed cookies, shared and read-only; parsed once per distinct content"""
+        path = self.save(cookies_str)
+        with self.hold(path):
+            return load_jar(path)
+
+    def purge(self) -> int:
+        """Remove idle cookie files; returns how many were deleted"""
+        removed = 0
+        cutoff = time.time() - self.max_idle
+        with self._lock:
+            for name in os.listdir(self.folder):
+                if not (name.startswith('user_cookies_') and name.endswith('.txt')):
+                    continue
+                path = os.path.join(self.folder, name)
+                entry = self._entries.get(path)
+                if entry is not None and entry[0] > 0:
+                    continue
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        self._entries.pop(path, None)
+                        with _jars_lock:
+                            _jars.pop(path, None)
+                        removed += 1
+                except FileNotFoundError:
+                    self._entries.pop(path, None)
+        return removed
+
+
+_stores: Dict[str, CookieStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_cookie_store(folder: Optional[str] = None) -> CookieStore:
+    """The process-wide store for a folder (TEMP_FOLDER by default), so reference counts are shared"""
+    if folder is None:
+        folder = os.getenv('TEMP_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp'))
+    folder = os.path.abspath(folder)
+    with _stores_lock:
+        store = _stores.get(folder)
+        if store is None:
+            store = _stores[folder] = CookieStore(folder)
+        return store
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Set
+
+# Reservation results
+CACHED = 'cached'
+IN_FLIGHT = 'in_flight'
+CLAIMED = 'claimed'
+
+# Sidecar whose mtime records the last request for a download
+USED_SUFFIX = '.used'
+
+
+class DownloadIndex:
+    """Content-addressed index of downloads in a folder
+
+    A download is identified by (video key, format string, postprocessing
+    profile) and stored under a filename derived from a hash of that key, so
+    the filesystem itself is the index and every worker process agrees on it.
+    In-flight downloads hold a lock file next to the output, and files being
+    served are reference counted so cleanup can skip them.
+
+    Reference counts live in memory, so is_referenced() only knows about
+    files served by this process. Every request also touches a `.used`
+    sidecar next to the file, and cleanup ages files by last_used(), which
+    keeps other workers' age-based cleanup away for a full max age. The
+    served file's own mtime is left alone: it feeds the ETag and
+    Last-Modified validators. On POSIX a file deleted while being served
+    keeps streaming from the open handle anyway.
+    """
+
+    def __init__(self, folder: str, stale_lock_age: float = 7200):
+        self.folder = folder
+        self.stale_lock_age = stale_lock_age
+        self._in_flight: Set[str] = set()
+        self._refs: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_filename(video_key: str, format_string: str, postprocessing: Any) -> str:
+        """Deterministic output filename for a download key"""
+        profile = json.dumps([video_key, format_string, postprocessing], sort_keys=True)
+        digest = hashlib.sha256(profile.encode('utf-8')).hexdigest()[:24]
+        return f'video_{digest}.mp4'
+
+    def _lock_path(self, filename: str) -> str:
+        return os.path.join(self.folder, f'{filename}.lock')
+
+    def _used_path(self, filename: str) -> str:
+        return os.path.join(self.folder, f'{filename}{USED_SUFFIX}')
+
+    def _touch_used(self, filename: str) -> None:
+        try:
+            with open(self._used_path(filename), 'a'):
+                pass
+            os.utime(self._used_path(filename))
+        except OSError:
+            pass
+
+    def last_used(self, filename: str) -> float:
+        """When the download was written or last requested; a sidecar counts for its download"""
+        if filename.endswith(USED_SUFFIX):
+            filename = filename[:-len(USED_SUFFIX)]
+        times = []
+        for path in (os.path.join(self.folder, filename), self._used_path(filename)):
+            try:
+                times.append(os.path.getmtime(path))
+            except OSError:
+                pass
+        return max(times, default=0.0)
+
+    def _lock_is_fresh(self, filename: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(self._lock_path(filename)) <= self.stale_lock_age
+        except OSError:
+            return False
+
+    def _take_lock_file(self, filename: str) -> bool:
+        """Create the lock file atomically; False if another process holds it"""
+        lock_path = self._lock_path(filename)
+        try:
+            if time.time() - os.path.getmtime(lock_path) > self.stale_lock_age:
+                os.remove(lock_path)
+        except OSError:
+            pass
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+    def reserve(self, filename: str) -> str:
+        """Decide how a request for filename is served: CACHED, IN_FLIGHT or CLAIMED
+
+        CLAIMED means the caller owns the download and must call finish() when done.
+        """
+        file_path = os.path.join(self.folder, filename)
+        with self._lock:
+            # A fresh lock wins over an existing file: another process may still be
+            # writing or validating it
+            if filename in self._in_flight or self._lock_is_fresh(filename):
+                return IN_FLIGHT
+            if os.path.isfile(file_path) and os.path.getsize(file_path) > 0:
+                # Cleanup counts from the last request
+                self._touch_used(filename)
+                return CACHED
+            if not self._take_lock_file(filename):
+                return IN_FLIGHT
+            self._in_flight.add(filename)
+            return CLAIMED
+
+    def finish(self, filename: str) -> None:
+        """Release a claim taken by reserve()"""
+        with self._lock:
+            self._in_flight.discard(filename)
+            try:
+                os.remove(self._lock_path(filename))
+            except OSError:
+                pass
+
+    def acquire(self, filename: str) -> None:
+        """Mark a file as being served by this process"""
+        with self._lock:
+            self._refs[filename] += 1
+        # Visible to cleanup in every process, unlike the reference count
+        self._touch_used(filename)
+
+    def release(self, filename: str) -> None:
+        """Drop a reference taken by acquire()"""
+        with self._lock:
+            self._refs[filename] -= 1
+            if self._refs[filename] <= 0:
+                del self._refs[filename]
+
+    def is_referenced(self, filename: str) -> bool:
+        """True if this process is serving the file, or it belongs to an in-flight download
+
+        Part files and lock files share the download's stem, so they are kept
+        for as long as any process holds a fresh lock for that download.
+        """
+        stem = filename.split('.', 1)[0]
+        with self._lock:
+            if self._refs.get(filename):
+                return True
+            if any(name.split('.', 1)[0] == stem for name in self._in_flight):
+                return True
+        return self._lock_is_fresh(f'{stem}.mp4')
@@ -1,36 +1,144 @@
-import yt_dlp
-import requests
+import copy
+import threading
 import time
 import logging
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List, Tuple
+from urllib.parse import urlparse
+
+from rate_limiter import HostRateLimiter, get_host_rate_limiter
+from segmented_download import SegmentedDownloader, SessionPool
+from ytdl_pool import YoutubeDLPool, get_ytdl_pool
+
+# Download strategies, in the order tried for a domain with no history
+REQUESTED_FORMAT = 'requested_format'
+FALLBACK_FORMAT = 'fallback_format'
+DIRECT = 'direct'
+STRATEGIES = [REQUESTED_FORMAT, FALLBACK_FORMAT, DIRECT]
+
+FALLBACK_FORMAT_SPEC = 'best/bestvideo+bestaudio'
+# A single progressive file that plain HTTP range requests can fetch
+DIRECT_FORMAT_SPEC = 'best[protocol=https]/best[protocol=http]'
+
+
+class StrategyStats:
+    """Recent success and latency of each download strategy, per domain
+
+    Both are exponentially weighted, so a strategy that worked on the last few
+    downloads from a site moves to the front and one that keeps failing drops
+    back. Strategies with no history score 0.5 and keep their default order.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        # (domain, strategy) -> [success EWMA, latency EWMA or None, attempts]
+        self._stats: Dict[Tuple[str, str], List] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def domain(url: str) -> str:
+        netloc = urlparse(url).netloc.lower()
+        return netloc[4:] if netloc.startswith('www.') else netloc
+
+    def record(self, url: str, strategy: str, success: bool, latency: float) -> None:
+        key = (self.domain(url), strategy)
+        with self._lock:
+            stat = self._stats.setdefault(key, [0.5, None, 0])
+            stat[0] = self.alpha * float(success) + (1 - self.alpha) * stat[0]
+            if success:
+                stat[1] = latency if stat[1] is None else self.alpha * latency + (1 - self.alpha) * stat[1]
+            stat[2] += 1
+
+    def order(self, url: str, strategies: List[str] = STRATEGIES) -> List[str]:
+        """Strategies most likely to succeed first; among equals, the faster one"""
+        domain = self.domain(url)
+        with self._lock:
+            stats = {s: self._stats.get((domain, s), [0.5, None, 0]) for s in strategies}
+        return sorted(strategies, key=lambda s: (
+            -round(stats[s][0], 2), stats[s][1] if stats[s][1] is not None else float('inf')
+        ))
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (domain, strategy), (success, latency, attempts) in self._stats.items():
+                result.setdefault(domain, {})[strategy] = {
+                    'success': round(success, 3),
+                    'latency': round(latency, 3) if latency is not None else None,
+                    'attempts': attempts
+                }
+            return result
+
+
+# Shared by every FallbackDownloader in the process, so the ordering learns across downloads
+_strategy_stats = StrategyStats()
+
 
 class FallbackDownloader:
-    def __init__(self, proxy_manager=None, browser_emulator=None):
+    def __init__(self, proxy_manager=None, browser_emulator=None, stats: Optional[StrategyStats] = None,
+                 ydl_pool: Optional[YoutubeDLPool] = None, rate_limiter: Optional[HostRateLimiter] = None):
         self.proxy_manager = proxy_manager
         self.browser_emulator = browser_emulator
+        self.stats = stats or _strategy_stats
+        self.ydl_pool = ydl_pool or get_ytdl_pool()
+        self.rate_limiter = rate_limiter or get_host_rate_limiter()
         self.logger = logging.getLogger(__name__)
+        # Keep-alive sessions shared by every direct download, one per proxy/host
+        self.sessions = SessionPool()
+        self.segmented = SegmentedDownloader(self.sessions)
 
-    def _try_download_with_yt_dlp(self, url: str, output_path: str, ydl_opts: Dict[str, Any]) -> bool:
-        """Try downloading with yt-dlp"""
+    def _extract(self, url: str, ydl_opts: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Run the extractor once without resolving formats; every strategy reuses the result
+
+        Returns (info, None) on success and (None, error message) on failure.
+        """
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            with self.ydl_pool.borrow(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False, process=False)
+            self.rate_limiter.record_success(url)
+            return info, None
+        except Exception as e:
+            self.logger.error(f"yt-dlp extraction failed: {e}")
+            self.rate_limiter.record_error(url, str(e))
+            return None, str(e)
+
+    def _try_download_with_yt_dlp(self, info: Dict[str, Any], output_path: str, ydl_opts: Dict[str, Any]) -> bool:
+        """Try downloading with yt-dlp, from an already extracted info dict"""
+        try:
+            with self.ydl_pool.borrow(ydl_opts) as ydl:
+                # Format selection and download only; no second round trip to the site
+                ydl.process_ie_result(copy.deepcopy(info), download=True)
+            # A direct download of the same file left over from an earlier attempt is no longer needed
+            self.segmented.discard_partial(output_path)
             return True
         except Exception as e:
             self.logger.error(f"yt-dlp download failed: {e}")
             return False
 
-    def _try_download_with_requests(self, url: str, output_path: str, headers: Dict[str, str]) -> bool:
-        """Try downloading directly with requests"""
+    def _try_direct_download(self, info: Dict[str, Any], output_path: str, ydl_opts: Dict[str, Any],
+                             headers: Dict[str, str], proxy: Optional[str]) -> bool:
+        """Pick a single progressive format from the info dict and fetch it over HTTP"""
         try:
-            response = requests.get(url, headers=headers, stream=True)
-            if response.status_code == 200:
-                with open(output_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                return True
+            with self.ydl_pool.borrow(dict(ydl_opts, format=DIRECT_FORMAT_SPEC)) as ydl:
+                selected = ydl.process_ie_result(copy.deepcopy(info), download=False)
+        except Exception as e:
+            self.logger.error(f"No direct format available: {e}")
+            return False
+        direct_url = selected.get('url')
+        if not direct_url:
             return False
+        # The extractor's headers (e.g. Referer, cookies) are often required by the CDN
+        direct_headers = dict(headers, **(selected.get('http_headers') or {}))
+        return self._try_download_with_requests(direct_url, output_path, direct_headers, proxy)
+
+    def _try_download_with_requests(self, url: str, output_path: str, headers: Dict[str, str],
+                                    proxy: Optional[str] = None) -> bool:
+        """Try downloading directly, in parallel byte ranges when the server allows it
+
+        A failed transfer leaves its partial file behind, so the next attempt
+        (with the next proxy) resumes it if the source hasn't changed.
+        """
+        try:
+            return self.segmented.download(url, output_path, headers, proxy)
         except Exception as e:
             self.logger.error(f"Requests download failed: {e}")
             return False
@@ -40,10 +148,15 @@ class FallbackDownloader:
         """
         Try different methods to download the video
         Returns True if any method succeeds
+
+        Each attempt extracts the video info once and hands it to the
+        strategies, ordered by how well they have done on this domain lately.
         """
         methods_tried = 0
         max_attempts = 3
 
+        # Every attempt waits its turn; later ones also wait the host's retry delay first
+        self.rate_limiter.acquire(url)
         while methods_tried < max_attempts:
             # Get fresh headers and proxy for each attempt
             headers = self.browser_emulator.get_headers() if self.browser_emulator else {}
@@ -65,27 +178,34 @@ class FallbackDownloader:
             if proxy:
                 ydl_opts['proxy'] = proxy.get('http')
 
-            # Method 1: Try yt-dlp with current settings
-            if self._try_download_with_yt_dlp(url, output_path, ydl_opts):
-                return True
-
-            # Method 2: Try with different format options
-            ydl_opts['format'] = 'best/bestvideo+bestaudio'
-            if self._try_download_with_yt_dlp(url, output_path, ydl_opts):
-                return True
-
-            # Method 3: Try direct download if we have a direct video URL
-            try:
-                with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    direct_url = info.get('url')
-                    if direct_url and self._try_download_with_requests(direct_url, output_path, headers):
+            # yt-dlp retries wait on the host's limiter instead of a fixed schedule
+            retry_delay = self.rate_limiter.bucket(url).retry_delay
+            ydl_opts['retry_sleep_functions'] = {'http': retry_delay, 'fragment': retry_delay}
+
+            info, error = self._extract(url, ydl_opts)
+            if proxy and self.proxy_manager:
+                # Only failures the proxy is to blame for count against it
+                self.proxy_manager.record_result(proxy, error)
+            if info is not None:
+                for strategy in self.stats.order(url):
+                    started = time.monotonic()
+                    if strategy == REQUESTED_FORMAT:
+                        ok = self._try_download_with_yt_dlp(info, output_path, ydl_opts)
+                    elif strategy == FALLBACK_FORMAT:
+                        ok = self._try_download_with_yt_dlp(
+                            info, output_path, dict(ydl_opts, format=FALLBACK_FORMAT_SPEC)
+                        )
+                    else:
+                        ok = self._try_direct_download(
+                            info, output_path, ydl_opts, headers, proxy.get('http') if proxy else None
+                        )
+                    self.stats.record(url, strategy, ok, time.monotonic() - started)
+                    if ok:
                         return True
-            except:
-                pass
 
             methods_tried += 1
             if methods_tried < max_attempts:
-                time.sleep(2)  # Wait before next attempt
+                time.sleep(self.rate_limiter.bucket(url).retry_delay(methods_tried - 1))
+                self.rate_limiter.acquire(url)
 
         return False
@@ -0,0 +1,49 @@
+import queue
+import threading
+import logging
+from typing import Callable, List
+
+
+class JobQueue:
+    """FIFO job queue served by a fixed-size pool of worker threads"""
+
+    def __init__(self, num_workers: int = 2, name: str = 'jobs'):
+        self.num_workers = max(1, num_workers)
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self._queue: queue.Queue = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def _ensure_workers(self) -> None:
+        """Start the worker threads on first use so forked processes get their own pool"""
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            while len(self._workers) < self.num_workers:
+                worker = threading.Thread(
+                    target=self._run,
+                    name=f'{self.name}-worker-{len(self._workers) + 1}',
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def _run(self) -> None:
+        """Worker loop: take jobs off the queue until the process exits"""
+        while True:
+            func, args, kwargs = self._queue.get()
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                self.logger.error(f"Unhandled error in {self.name} job: {e}")
+            finally:
+                self._queue.task_done()
+
+    def submit(self, func: Callable, *args, **kwargs) -> None:
+        """Queue a job for execution by the worker pool"""
+        self._ensure_workers()
+        self._queue.put((func, args, kwargs))
+
+    def pending(self) -> int:
+        """Number of jobs waiting for a free worker"""
+        return self._queue.qsize()
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states that are always written through immediately
+FINAL_STATUSES = ('completed', 'error')
+
+
+class JobStore(ABC):
+    """Interface for job state backends used by the download and upload paths"""
+
+    @abstractmethod
+    def get(self, job_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """The job's latest state, or default if the store has none"""
+
+    @abstractmethod
+    def set(self, job_id: str, state: Dict[str, Any]) -> None:
+        """Record the job's latest state"""
+
+    def __getitem__(self, job_id: str) -> Dict[str, Any]:
+        state = self.get(job_id)
+        if state is None:
+            raise KeyError(job_id)
+        return state
+
+    def __setitem__(self, job_id: str, state: Dict[str, Any]) -> None:
+        self.set(job_id, state)
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+
+
+class MemoryJobStore(JobStore):
+    """Per-process dictionary; only suitable for a single worker"""
+
+    def __init__(self):
+        self._states: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, job_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        return self._states.get(job_id, default)
+
+    def set(self, job_id: str, state: Dict[str, Any]) -> None:
+        self._states[job_id] = state
+
+
+class SQLiteJobStore(JobStore):
+    """Job state shared by every process on the host through a SQLite file in WAL mode
+
+    Progress hooks fire many times per second, so repeated updates with the same
+    status are held in memory and written at most once per write_interval.
+    Status changes and final states are written immediately. A timer writes
+    held updates after write_interval even if no further update arrives, so
+    other workers never read progress more than that stale. Write times older
+    than write_interval no longer hold any update back and are forgotten on
+    each flush and every 1000 writes, so jobs abandoned before a final state
+    do not accumulate.
+    """
+
+    def __init__(self, db_path: str, write_interval: float = 0.5, max_age: float = 86400):
+        self.db_path = db_path
+        self.write_interval = write_interval
+        self.max_age = max_age
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._last_write: Dict[str, tuple] = {}
+        self._writes = 0
+        self._timer: Optional[threading.Timer] = None
+        self._timer_pid: Optional[int] = None
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._init_db()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread, reopened after a fork"""
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = pid
+        return self._local.conn
+
+    def _init_db(self) -> None:
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'job_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._purge()
+
+    def _purge(self) -> None:
+        """Drop jobs that have not been updated for max_age seconds"""
+        self._connection().execute('DELETE FROM jobs WHERE updated_at < ?', (time.time() - self.max_age,))
+
+    def _write(self, job_id: str, state: Dict[str, Any], now: float) -> None:
+        self._connection().execute(
+            'INSERT OR REPLACE INTO jobs (job_id, state, updated_at) VALUES (?, ?, ?)',
+            (job_id, json.dumps(state), now)
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._purge()
+            self._forget_stale_writes()
+
+    def get(self, job_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            pending = self._pending.get(job_id)
+        if pending is not None:
+            return pending
+        try:
+            row = self._connection().execute('SELECT state FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading job state: {e}")
+            return default
+        return json.loads(row[0]) if row else default
+
+    def set(self, job_id: str, state: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        status = state.get('status')
+        with self._lock:
+            last_status, last_time = self._last_write.get(job_id, (None, 0.0))
+            if (status == last_status and status not in FINAL_STATUSES
+                    and now - last_time < self.write_interval):
+                # Same status written recently: keep the latest copy in memory only
+                self._pending[job_id] = state
+                self._schedule_flush()
+                return
+            self._pending.pop(job_id, None)
+            self._last_write[job_id] = (status, now)
+            if status in FINAL_STATUSES:
+                del self._last_write[job_id]
+            # Under the lock, so a timed flush can't land an older state after this one
+            try:
+                self._write(job_id, state, time.time())
+            except sqlite3.Error as e:
+                logger.error(f"Error writing job state: {e}")
+
+    def _schedule_flush(self) -> None:
+        """Start the flush timer unless one is already pending in this process (call with _lock held)"""
+        # A timer inherited through fork never fires in the child
+        if self._timer is not None and self._timer_pid == os.getpid():
+            return
+        self._timer = threading.Timer(self.write_interval, self.flush)
+        self._timer.daemon = True
+        self._timer_pid = os.getpid()
+        self._timer.start()
+
+    def flush(self) -> None:
+        """Write every held update now"""
+        now = time.monotonic()
+        with self._lock:
+            self._timer = None
+            pending, self._pending = self._pending, {}
+            for job_id, state in pending.items():
+                self._last_write[job_id] = (state.get('status'), now)
+                try:
+                    self._write(job_id, state, time.time())
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing job state: {e}")
+            self._forget_stale_writes()
+
+    def _forget_stale_writes(self) -> None:
+        """Drop write times too old to hold an update back (call with _lock held)"""
+        now = time.monotonic()
+        self._last_write = {job_id: last for job_id, last in self._last_write.items()
+                            if now - last[1] < self.write_interval}
+
+
+def create_job_store(backend: str = 'sqlite', db_path: Optional[str] = None, **kwargs) -> JobStore:
+    """Build the configured job state backend"""
+    if backend == 'memory':
+        return MemoryJobStore()
+    if backend == 'sqlite':
+        if not db_path:
+            raise ValueError('SQLite job store requires db_path')
+        return SQLiteJobStore(db_path, **kwargs)
+    raise ValueError(f'Unknown job store backend: {backend}')
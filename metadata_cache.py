@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache:
+    """TTL + LRU cache for extracted video metadata, optionally backed by SQLite
+
+    The in-memory layer serves repeat lookups within a process. When db_path is
+    set, entries are also written to a SQLite database so every worker process
+    sharing the file sees each other's extractions.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._init_db()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One SQLite connection per thread, reopened after a fork"""
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = pid
+        return self._local.conn
+
+    def _init_db(self) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS metadata ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed_at)')
+
+    def _get_memory(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_memory(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_db(self, key: str, now: float) -> Optional[tuple]:
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT value, expires_at FROM metadata WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE metadata SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(row[0]), row[1]
+
+    def _set_db(self, key: str, value: Dict[str, Any], expires_at: float, now: float) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO metadata (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), expires_at, now)
+            )
+            conn.execute('DELETE FROM metadata WHERE expires_at <= ?', (now,))
+            # Evict least recently used rows beyond the size limit
+            conn.execute(
+                'DELETE FROM metadata WHERE key IN ('
+                'SELECT key FROM metadata ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for key, or None if missing or expired"""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self.db_path:
+            try:
+                row = self._get_db(key, now)
+                if row is not None:
+                    value, expires_at = row
+                    self._set_memory(key, value, expires_at)
+            except sqlite3.Error as e:
+                logger.error(f"Error reading metadata cache: {e}")
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store value under key for the configured TTL"""
+        now = time.time()
+        expires_at = now + self.ttl
+        self._set_memory(key, value, expires_at)
+        if self.db_path:
+            try:
+                self._set_db(key, value, expires_at, now)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing metadata cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'backend': 'sqlite' if self.db_path else 'memory',
+                'pid': os.getpid()
+            }
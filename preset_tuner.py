@@ -0,0 +1,172 @@
+import fcntl
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+import ffmpeg
+
+import trim_engine
+
+# Fastest to slowest; the tuner never goes slower than ffmpeg's default
+PRESETS = ['ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium']
+DEFAULT_PRESET = 'medium'
+
+# Synthetic calibration clip: detailed moving pattern plus a tone
+CLIP_DURATION = 6
+CLIP_SIZE = '1280x720'
+CLIP_RATE = 30
+# Targets tried per preset, as total bitrates in kbps
+TARGET_KBPS = (400, 1500)
+
+
+def host_key() -> str:
+    """Identifies the machine a calibration was measured on"""
+    return f'{platform.node()}-{platform.machine()}-{os.cpu_count()}cpu'
+
+
+def make_clip(path: str) -> None:
+    """Write a synthetic test clip so calibration needs no sample media"""
+    video = ffmpeg.input(f'testsrc2=size={CLIP_SIZE}:rate={CLIP_RATE}', f='lavfi', t=CLIP_DURATION)
+    audio = ffmpeg.input('sine=frequency=440:sample_rate=44100', f='lavfi', t=CLIP_DURATION)
+    stream = ffmpeg.output(video, audio, path, **{
+        'c:v': 'libx264', 'preset': 'ultrafast', 'crf': 12, 'g': CLIP_RATE * 2,
+        'pix_fmt': 'yuv420p', 'c:a': 'aac', 'b:a': '192k'
+    })
+    ffmpeg.run(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
+
+
+def benchmark(threads: int = 0) -> Dict[str, Dict[str, float]]:
+    """Time every preset on a synthetic clip and measure how close it lands to the size target
+
+    Returns, per preset, the encode speed as a multiple of real time and the
+    worst relative size error over TARGET_KBPS.
+    """
+    work_dir = tempfile.mkdtemp(prefix='preset_tuner_')
+    try:
+        clip = os.path.join(work_dir, 'clip.mp4')
+        make_clip(clip)
+        results = {}
+        for preset in PRESETS:
+            elapsed = 0.0
+            worst_error = 0.0
+            for kbps in TARGET_KBPS:
+                target_size = kbps * 1000 / 8 * CLIP_DURATION
+                output = os.path.join(work_dir, f'{preset}_{kbps}.mp4')
+                started = time.perf_counter()
+                trim_engine.compress(clip, output, 0, CLIP_DURATION, target_size, threads=threads, preset=preset)
+                elapsed += time.perf_counter() - started
+                worst_error = max(worst_error, abs(os.path.getsize(output) - target_size) / target_size)
+            results[preset] = {
+                'speed': len(TARGET_KBPS) * CLIP_DURATION / elapsed,
+                'size_error': worst_error
+            }
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def pick_preset(results: Dict[str, Dict[str, float]], tolerance: float) -> str:
+    """Fastest measured preset whose size error is within tolerance"""
+    accurate = [p for p in PRESETS if p in results and results[p]['size_error'] <= tolerance]
+    if accurate:
+        return max(accurate, key=lambda p: results[p]['speed'])
+    if results:
+        # Nothing meets the tolerance; take whatever comes closest
+        return min(results, key=lambda p: results[p]['size_error'])
+    return DEFAULT_PRESET
+
+
+class PresetTuner:
+    """Chooses the x264 preset for size-targeted compression from a per-host benchmark
+
+    Measurements are stored in a JSON file keyed by host, so calibration runs
+    once per machine no matter how many processes share the file. Until it
+    has run, preset() returns DEFAULT_PRESET and starts calibrating in the
+    background.
+    """
+
+    def __init__(self, cache_path: str, tolerance: float = 0.1, threads: int = 0):
+        self.cache_path = cache_path
+        self.tolerance = tolerance
+        self.threads = threads
+        self.logger = logging.getLogger(__name__)
+        self._results: Optional[Dict[str, Dict[str, float]]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Optional[Dict[str, Dict[str, float]]]:
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f).get(host_key())
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, results: Dict[str, Dict[str, float]]) -> None:
+        try:
+            with open(self.cache_path) as f:
+                hosts = json.load(f)
+        except (OSError, ValueError):
+            hosts = {}
+        hosts[host_key()] = results
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(hosts, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def calibrate(self, force: bool = False) -> Dict[str, Dict[str, float]]:
+        """Run the benchmark unless this host already has results
+
+        A lock file keeps concurrent processes from benchmarking at the same time;
+        the ones that wait pick up the winner's results.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        with open(f'{self.cache_path}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            results = None if force else self._load()
+            if results is None:
+                self.logger.info('Calibrating x264 presets for size-targeted compression')
+                results = benchmark(self.threads)
+                self._save(results)
+        self._results = results
+        return results
+
+    def _calibrate_in_background(self) -> None:
+        try:
+            self.calibrate()
+            self.logger.info(f'Using x264 preset {self.preset()} for size-targeted compression')
+        except Exception as e:
+            self.logger.error(f'Preset calibration failed: {e}')
+            # Don't retry on every request; the default preset is used until restart
+            self._results = {}
+
+    def preset(self) -> str:
+        """Preset to use now; never blocks on calibration"""
+        if self._results is None:
+            self._results = self._load()
+        if self._results is not None:
+            return pick_preset(self._results, self.tolerance)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._calibrate_in_background, name='preset-tuner', daemon=True
+                )
+                self._thread.start()
+        return DEFAULT_PRESET
+
+
+if __name__ == '__main__':
+    # Calibrate ahead of time, e.g. during a deploy: python preset_tuner.py [cache_path]
+    logging.basicConfig(level=logging.INFO)
+    temp_folder = os.getenv('TEMP_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp'))
+    cache_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(temp_folder, 'x264_presets.json')
+    tuner = PresetTuner(cache_path, tolerance=float(os.getenv('TARGET_SIZE_TOLERANCE', 0.1)))
+    for name, result in tuner.calibrate(force=True).items():
+        print(f"{name:>10}: {result['speed']:6.2f}x realtime, size error {result['size_error']:.1%}")
+    print(f'Selected preset: {tuner.preset()}')
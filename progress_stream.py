@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+# Job states after which no further updates are sent
+FINAL_STATUSES = ('completed', 'error')
+# State reported for a job ID the store does not know: not started yet, purged or mistyped
+UNKNOWN_STATUS = 'unknown'
+
+
+class ProgressBroker:
+    """Wakes streaming subscribers whenever any job's progress changes"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        with self._cond:
+            return self._version
+
+    def publish(self) -> None:
+        """Signal that job state has changed"""
+        with self._cond:
+            self._version += 1
+            self._cond.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        """Block until the version moves past the one given or the timeout expires"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+
+def format_event(event: str, data: Any) -> str:
+    """Encode a Server-Sent Events message"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def stream_progress(job_ids: Iterable[str], get_state: Callable[[str], Dict[str, Any]],
+                    broker: ProgressBroker, max_rate: float = 4.0,
+                    max_duration: float = 60.0, heartbeat: float = 15.0,
+                    poll_interval: Optional[float] = None,
+                    retry_ms: Optional[int] = 1000, unknown_grace: float = 5.0) -> Iterator[str]:
+    """Yield SSE messages for a set of jobs until they all finish
+
+    Updates that arrive faster than max_rate batches per second are coalesced:
+    only the latest state of each job is sent per batch. The stream ends after
+    max_duration so a connection never outlives the server's worker timeout;
+    EventSource clients reconnect on their own and get the current state again.
+    With poll_interval set, states are re-read at least that often even without
+    a local publish, for jobs whose updates come from other processes.
+    A job still unknown unknown_grace seconds into the stream gets a final
+    error event, so a purged or mistyped ID ends the stream instead of
+    keeping the client reconnecting forever.
+    """
+    pending = list(dict.fromkeys(job_ids))
+    last_sent: Dict[str, Dict[str, Any]] = {}
+    min_interval = 1.0 / max_rate if max_rate > 0 else 0
+    max_wait = min(heartbeat, poll_interval) if poll_interval else heartbeat
+    started = last_write = time.monotonic()
+
+    if retry_ms is not None:
+        yield f'retry: {retry_ms}\n\n'
+
+    while True:
+        version = broker.version
+        for job_id in list(pending):
+            state = get_state(job_id)
+            if state.get('status') == UNKNOWN_STATUS and time.monotonic() - started >= unknown_grace:
+                state = dict(state, status='error', error='Unknown job')
+            if state != last_sent.get(job_id):
+                last_sent[job_id] = state
+                last_write = time.monotonic()
+                yield format_event('progress', dict(state, job_id=job_id))
+            if state.get('status') in FINAL_STATUSES:
+                pending.remove(job_id)
+
+        if not pending:
+            yield format_event('done', {'jobs': list(last_sent)})
+            return
+
+        now = time.monotonic()
+        if now - started >= max_duration:
+            return
+        if now - last_write >= heartbeat:
+            last_write = now
+            yield ': keepalive\n\n'
+
+        # Coalesce bursts, then sleep until something changes
+        time.sleep(min_interval)
+        wait = min(max_wait, max_duration - (time.monotonic() - started))
+        if any(last_sent.get(job_id, {}).get('status') == UNKNOWN_STATUS for job_id in pending):
+            wait = min(wait, unknown_grace - (time.monotonic() - started))
+        broker.wait(version, timeout=max(0.0, wait))
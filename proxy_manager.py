@@ -1,40 +1,314 @@
+import asyncio
+import atexit
+import aiohttp
 import requests
 import random
+import threading
 import time
 import os
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from rate_limiter import THROTTLE_SIGNALS
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_TEST_URLS = ['https://www.youtube.com', 'https://www.google.com']
+
+# Picks from a stale selection table before giving up and rebuilding it
+MAX_PICK_ATTEMPTS = 8
+
+# Error text that means the proxy, not the video, failed: it could not be reached,
+# refused us, timed out, or its address is being throttled by the site
+PROXY_FAILURE_SIGNALS = (
+    'Unable to connect to proxy',
+    'ProxyError',
+    'Tunnel connection failed',
+    'Proxy Authentication Required',
+    'HTTP Error 407',
+    'timed out',
+    'Connection refused',
+    'Connection reset',
+    'Remote end closed connection',
+    'Failed to establish a new connection',
+) + THROTTLE_SIGNALS
+
+
+def is_proxy_failure(error_msg: str) -> bool:
+    return any(signal in error_msg for signal in PROXY_FAILURE_SIGNALS)
+
+
+class ProxyHealth:
+    """Rolling health of one proxy, fed by background checks and real use"""
+
+    def __init__(self, alpha: float = 0.3, failure_threshold: int = 3,
+                 open_duration: float = 300, max_open_duration: float = 3600):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.base_open_duration = open_duration
+        self.max_open_duration = max_open_duration
+        self.open_duration = open_duration
+        self.latency: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.checked_at = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace smoothing so a single result doesn't dominate
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.open_duration = self.base_open_duration
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            # Failed its trial: stay out for twice as long
+            self.open_duration = min(self.open_duration * 2, self.max_open_duration)
+            self._open()
+        elif self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def probe_due(self, now: float) -> bool:
+        """Whether a health check may be sent; moves an expired open breaker to half-open"""
+        if self.state == OPEN and now - self.opened_at >= self.open_duration:
+            self.state = HALF_OPEN
+        return self.state != OPEN
+
+    def weight(self) -> float:
+        """Selection weight: reliable, fast proxies are picked more often"""
+        if self.state != CLOSED or self.latency is None:
+            return 0.0
+        return self.success_rate / max(self.latency, 0.05)
+
+
+def validate_proxies(addresses: Iterable[str], url: str, concurrency: int = 500,
+                     timeout: float = 5.0) -> List[Tuple[str, float]]:
+    """Check every proxy concurrently; returns (address, latency) for the ones that work, fastest first"""
+    return asyncio.run(_validate_proxies(list(addresses), url, concurrency, timeout))
+
+
+async def _validate_proxies(addresses: List[str], url: str, concurrency: int,
+                            timeout: float) -> List[Tuple[str, float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0'}
+
+    async def check(session: aiohttp.ClientSession, address: str) -> Optional[Tuple[str, float]]:
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                async with session.get(url, proxy=f'http://{address}', headers=headers) as response:
+                    if response.status != 200:
+                        return None
+                    return address, time.monotonic() - started
+            except Exception:
+                # Refused, timed out, bad address or garbage reply: all mean unusable
+                return None
+
+    # No keep-alive: every proxy is a different host, so pooled connections are never reused
+    connector = aiohttp.TCPConnector(limit=concurrency, force_close=True)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        results = await asyncio.gather(*(check(session, address) for address in addresses))
+    return sorted((r for r in results if r is not None), key=lambda r: r[1])
+
+
+def build_alias_table(weights: List[float]) -> Tuple[List[float], List[int]]:
+    """Walker/Vose alias table for O(1) sampling from a discrete distribution"""
+    n = len(weights)
+    total = sum(weights)
+    prob = [0.0] * n
+    alias = list(range(n))
+    scaled = [w * n / total for w in weights]
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    for i in small + large:
+        prob[i] = 1.0
+    return prob, alias
+
+
+class ProxyPool:
+    """Thread-safe set of proxies with O(1) add, remove, lookup and random sampling
+
+    Entries live in a list with a dict mapping each address to its position;
+    removal swaps the last entry into the gap. Changes mark the pool dirty and
+    a single timer writes the whole file at most once per flush_interval, so
+    bursts of removals cost one write instead of one per call.
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._items: List[Dict[str, str]] = []
+        self._index: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        if path:
+            atexit.register(self.flush)
+
+    @staticmethod
+    def make_proxy(address: str) -> Dict[str, str]:
+        return {'http': f'http://{address}', 'https': f'http://{address}'}
+
+    @staticmethod
+    def address(proxy: Dict[str, str]) -> str:
+        return proxy['http'].replace('http://', '', 1)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._index
+
+    def get(self, address: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            i = self._index.get(address)
+            return self._items[i] if i is not None else None
+
+    def snapshot(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return list(self._items)
+
+    def sample(self) -> Optional[Dict[str, str]]:
+        with self._lock:
+            return random.choice(self._items) if self._items else None
+
+    def add(self, address: str) -> None:
+        with self._lock:
+            if address not in self._index:
+                self._index[address] = len(self._items)
+                self._items.append(self.make_proxy(address))
+                self._mark_dirty()
+
+    def remove(self, address: str) -> bool:
+        with self._lock:
+            i = self._index.pop(address, None)
+            if i is None:
+                return False
+            last = self._items.pop()
+            if i < len(self._items):
+                self._items[i] = last
+                self._index[self.address(last)] = i
+            self._mark_dirty()
+            return True
+
+    def replace(self, addresses: Iterable[str], persist: bool = True) -> None:
+        """Swap in a new proxy list, e.g. after a refresh"""
+        with self._lock:
+            self._items = []
+            self._index = {}
+            for address in addresses:
+                address = address.strip()
+                if address and address not in self._index:
+                    self._index[address] = len(self._items)
+                    self._items.append(self.make_proxy(address))
+            if persist:
+                self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self.path and self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Write the current list to disk if it changed since the last write"""
+        with self._lock:
+            self._timer = None
+            if not self._dirty or not self.path:
+                return
+            data = '\n'.join(self.address(p) for p in self._items)
+            self._dirty = False
+        try:
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving proxies: {e}")
+
+
 class ProxyManager:
-    def __init__(self):
-        self.proxies: List[Dict[str, str]] = []
+    """Pool of HTTP proxies scored by a background health checker
+
+    A checker thread probes a batch of proxies through test_urls every
+    check_interval seconds, keeping a latency EWMA, a success rate and a
+    circuit breaker per proxy. get_proxy() samples a healthy proxy weighted by
+    those scores from a precomputed alias table, without touching the network.
+    """
+
+    def __init__(self, test_urls: Optional[List[str]] = None, check_interval: float = 30,
+                 check_batch: int = 50, check_workers: int = 16, check_timeout: float = 5,
+                 warmup_timeout: float = 10, proxy_file: Optional[str] = None,
+                 validate_concurrency: int = 500, validate_timeout: float = 5):
         self.last_update = 0
         self.update_interval = 1800  # Update proxy list every 30 minutes
-        self.proxy_file = os.path.join(os.path.dirname(__file__), 'proxyscrape_premium_http_proxies.txt')
-        self._load_proxies()
+        self.proxy_file = proxy_file or os.path.join(os.path.dirname(__file__), 'proxyscrape_premium_http_proxies.txt')
+        self.pool = ProxyPool(self.proxy_file)
+        self.test_urls = test_urls or DEFAULT_TEST_URLS
+        self.check_interval = check_interval
+        self.check_batch = check_batch
+        self.check_workers = check_workers
+        self.check_timeout = check_timeout
+        self.warmup_timeout = warmup_timeout
+        self.validate_concurrency = validate_concurrency
+        self.validate_timeout = validate_timeout
+        self.health: Dict[str, ProxyHealth] = {}
+        # (proxies, prob, alias) swapped in whole so readers never see a partial table
+        self._table: Tuple[List[Dict[str, str]], List[float], List[int]] = ([], [], [])
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._checker: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._cursor = 0
+        # The saved list is only a cold-start seed: the checker fetches and validates a
+        # fresh list every update_interval, and on its first round when there is no seed
+        if self._load_proxies():
+            self.last_update = time.time()
 
-    def _load_proxies(self) -> None:
-        """Load proxies from file"""
-        if os.path.exists(self.proxy_file):
-            try:
-                with open(self.proxy_file, 'r') as f:
-                    proxy_list = f.read().strip().split('\n')
-                self.proxies = [
-                    {
-                        'http': f'http://{proxy}',
-                        'https': f'http://{proxy}'
-                    }
-                    for proxy in proxy_list
-                    if proxy.strip()
-                ]
-            except Exception as e:
-                print(f"Error loading proxies from file: {e}")
-                self._fetch_proxies()
-        else:
-            self._fetch_proxies()
+    def _load_proxies(self) -> bool:
+        """Seed the pool from the saved list; returns whether anything was loaded"""
+        if not os.path.exists(self.proxy_file):
+            return False
+        # Write out removals still waiting for the debounced flush, so they are not read back
+        self.pool.flush()
+        try:
+            with open(self.proxy_file, 'r') as f:
+                proxy_list = f.read().strip().split('\n')
+            self.pool.replace(proxy_list, persist=False)
+            return len(self.pool) > 0
+        except Exception as e:
+            print(f"Error loading proxies from file: {e}")
+            return False
 
     def _fetch_proxies(self) -> None:
-        """Fetch free proxies from multiple sources"""
+        """Fetch free proxies from multiple sources and keep the ones that pass validation"""
         try:
             # Try multiple free proxy sources
             sources = [
@@ -53,82 +327,198 @@ class ProxyManager:
                 except:
                     continue
             
-            self.proxies = [
-                {
-                    'http': f'http://{proxy}',
-                    'https': f'http://{proxy}'
-                }
-                for proxy in proxy_list
-                if proxy.strip()
-            ]
+            # Keep only proxies that answer, fastest first
+            candidates = [proxy.strip() for proxy in proxy_list if proxy.strip()]
+            working = validate_proxies(
+                candidates, self.test_urls[0],
+                concurrency=self.validate_concurrency, timeout=self.validate_timeout
+            )
+            if candidates and not working:
+                print(f"None of {len(candidates)} fetched proxies passed validation; keeping the current list")
+                return
+            self.pool.replace(address for address, _ in working)
+            with self._lock:
+                self.health = {}
+            for address, latency in working:
+                self._record(self.pool.get(address), latency)
+            self._rebuild_table()
 
             # Save working proxies to file
-            if self.proxies:
-                with open(self.proxy_file, 'w') as f:
-                    f.write('\n'.join(proxy.strip() for proxy in proxy_list))
+            if len(self.pool):
+                self.pool.flush()
 
         except Exception as e:
             print(f"Error fetching proxies: {e}")
-            # Fallback to some reliable free proxies
-            self.proxies = [
-                {'http': 'http://localhost:8080', 'https': 'http://localhost:8080'},
-            ]
+            if not len(self.pool):
+                # Fallback to some reliable free proxies
+                self.pool.replace(['localhost:8080'], persist=False)
 
-    def _test_proxy(self, proxy: Dict[str, str]) -> Optional[Dict[str, str]]:
-        """Test a single proxy"""
+    def _test_proxy(self, proxy: Dict[str, str]) -> Optional[float]:
+        """Fetch every test URL through the proxy; returns the mean latency, or None on failure"""
         try:
-            test_urls = [
-                'https://www.youtube.com',
-                'https://www.google.com'
-            ]
-            
-            for url in test_urls:
+            started = time.monotonic()
+            for url in self.test_urls:
                 response = requests.get(
                     url,
                     proxies=proxy,
-                    timeout=5,
+                    timeout=self.check_timeout,
                     headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0'}
                 )
                 if response.status_code != 200:
                     return None
-            return proxy
+            return (time.monotonic() - started) / len(self.test_urls)
         except:
             return None
 
+    def _ensure_checker(self) -> None:
+        """Start the health checker on first use, and again in forked processes"""
+        with self._lock:
+            if self._pid == os.getpid() and self._checker and self._checker.is_alive():
+                return
+            self._pid = os.getpid()
+            self._executor = ThreadPoolExecutor(max_workers=self.check_workers, thread_name_prefix='proxy-check')
+            self._checker = threading.Thread(target=self._check_loop, name='proxy-health', daemon=True)
+            self._checker.start()
+
+    def _check_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if time.time() - self.last_update > self.update_interval:
+                    # Fetch the source lists and keep what passes validate_proxies
+                    self._fetch_proxies()
+                    self.last_update = time.time()
+                    with self._lock:
+                        self.health = {k: h for k, h in self.health.items() if k in self.pool}
+                self.check_proxies()
+            except Exception as e:
+                print(f"Error checking proxies: {e}")
+            finally:
+                # Don't keep get_proxy() waiting if nothing passed
+                self._ready.set()
+            self._stop.wait(self.check_interval)
+
+    def _next_batch(self) -> List[Dict[str, str]]:
+        """Next proxies in round-robin order whose breaker allows a probe"""
+        now = time.monotonic()
+        batch = []
+        with self._lock:
+            proxies = self.pool.snapshot()
+            for _ in range(len(proxies)):
+                if len(batch) >= self.check_batch:
+                    break
+                self._cursor %= len(proxies)
+                proxy = proxies[self._cursor]
+                self._cursor += 1
+                health = self.health.setdefault(ProxyPool.address(proxy), ProxyHealth())
+                if health.probe_due(now):
+                    batch.append(proxy)
+        return batch
+
+    def check_proxies(self) -> None:
+        """Probe one batch of proxies and refresh the selection table"""
+        batch = self._next_batch()
+        futures = {self._executor.submit(self._test_proxy, proxy): proxy for proxy in batch}
+        for future in as_completed(futures):
+            latency = future.result()
+            self._record(futures[future], latency)
+            if latency is not None and not self._table[0]:
+                # First healthy proxy: publish it right away for callers waiting on warmup
+                self._rebuild_table()
+                self._ready.set()
+        self._rebuild_table()
+
+    def _record(self, proxy: Dict[str, str], latency: Optional[float], ok: Optional[bool] = None) -> None:
+        """A probe result (latency, None on failure), or with ok a real-use outcome without a latency"""
+        if ok is None:
+            ok = latency is not None
+        with self._lock:
+            address = ProxyPool.address(proxy)
+            if address not in self.pool:
+                return
+            health = self.health.setdefault(address, ProxyHealth())
+            health.checked_at = time.monotonic()
+            if ok:
+                health.record_success(latency)
+            else:
+                health.record_failure()
+
+    def record_result(self, proxy: Dict[str, str], error: Optional[str] = None) -> bool:
+        """Feed a real download's outcome into the proxy's health; returns whether it counted
+
+        Only transport-level outcomes count: a failure must look like the
+        proxy's fault (is_proxy_failure), since a private or removed video
+        fails through any proxy. Latency stays the health check's, because
+        a download's duration depends on the video, not the proxy.
+        """
+        if error is not None and not is_proxy_failure(error):
+            return False
+        self._record(proxy, None, ok=error is None)
+        self._rebuild_table()
+        return True
+
+    def _rebuild_table(self) -> None:
+        with self._lock:
+            healthy = [(self.pool.get(a), h.weight()) for a, h in self.health.items()]
+            healthy = [(p, w) for p, w in healthy if p is not None and w > 0]
+            if healthy:
+                proxies, weights = zip(*healthy)
+                prob, alias = build_alias_table(list(weights))
+                self._table = (list(proxies), prob, alias)
+            else:
+                self._table = ([], [], [])
+
     def get_proxy(self) -> Optional[Dict[str, str]]:
-        """Get a random working proxy with parallel testing"""
-        current_time = time.time()
-        if current_time - self.last_update > self.update_interval:
-            self._load_proxies()
-            self.last_update = current_time
+        """Weighted random pick among healthy proxies, or None if none are known yet"""
+        self._ensure_checker()
+        if not self._table[0]:
+            # Cold start: give the first round of checks a chance to find one
+            self._ready.wait(self.warmup_timeout)
+        proxy = self._pick()
+        if proxy is None and self._table[0]:
+            # Every pick hit a removed proxy; drop them from the table and try again
+            self._rebuild_table()
+            proxy = self._pick()
+        return proxy
 
-        if not self.proxies:
+    def _pick(self) -> Optional[Dict[str, str]]:
+        proxies, prob, alias = self._table
+        if not proxies:
             return None
+        for _ in range(MAX_PICK_ATTEMPTS):
+            i = random.randrange(len(proxies))
+            proxy = proxies[i] if random.random() < prob[i] else proxies[alias[i]]
+            # The table is rebuilt after each check round; skip proxies removed since
+            if ProxyPool.address(proxy) in self.pool:
+                return proxy
+        return None
 
-        # Test multiple proxies in parallel
-        test_proxies = random.sample(self.proxies, min(5, len(self.proxies)))
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_proxy = {
-                executor.submit(self._test_proxy, proxy): proxy 
-                for proxy in test_proxies
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            states = [h.state for h in self.health.values()]
+            return {
+                'proxies': len(self.pool),
+                'checked': len(self.health),
+                'healthy': len(self._table[0]),
+                'open': states.count(OPEN),
+                'half_open': states.count(HALF_OPEN)
             }
-            
-            for future in as_completed(future_to_proxy):
-                result = future.result()
-                if result:
-                    return result
 
-        return None
+    @property
+    def proxies(self) -> List[Dict[str, str]]:
+        """Copy of the current proxy list"""
+        return self.pool.snapshot()
+
+    def close(self) -> None:
+        """Stop the health checker and write pending changes"""
+        self._stop.set()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+        self.pool.flush()
 
     def remove_proxy(self, proxy: Dict[str, str]) -> None:
         """Remove a non-working proxy from the list"""
-        if proxy in self.proxies:
-            self.proxies.remove(proxy)
-            # Update proxy file
-            if os.path.exists(self.proxy_file):
-                with open(self.proxy_file, 'w') as f:
-                    proxy_list = [
-                        p['http'].replace('http://', '')
-                        for p in self.proxies
-                    ]
-                    f.write('\n'.join(proxy_list))
+        address = ProxyPool.address(proxy)
+        with self._lock:
+            self.health.pop(address, None)
+        # The file is rewritten in the background, batched with other removals
+        self.pool.remove(address)
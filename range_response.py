@@ -0,0 +1,116 @@
+import mimetypes
+import os
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from flask import Request, Response
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+from werkzeug.wsgi import wrap_file
+
+# Read size used when the WSGI server can't sendfile and iterates the body
+BUFFER_SIZE = 256 * 1024
+
+
+class RangeFile:
+    """File-like view limited to length bytes from the current offset
+
+    WSGI servers with a sendfile path (gunicorn) use fileno() plus the response
+    Content-Length and never call read(); other servers iterate read(), which
+    stops at the end of the range. close() runs an optional callback so callers
+    can release references once the body has been sent.
+    """
+
+    def __init__(self, file, length: int, on_close: Optional[Callable[[], None]] = None):
+        self.file = file
+        self.remaining = length
+        self.on_close = on_close
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        try:
+            self.file.close()
+        finally:
+            if self.on_close:
+                callback, self.on_close = self.on_close, None
+                callback()
+
+
+def make_etag(stat: os.stat_result) -> str:
+    """Strong validator derived from the file's identity, size and mtime"""
+    return f'{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}'
+
+
+def send_file_ranged(request: Request, file_path: str, download_name: str,
+                     max_age: int = 3600, on_close: Optional[Callable[[], None]] = None) -> Response:
+    """Serve a file with ETag, conditional GET and single-range (206) support
+
+    The body is handed to the server's wsgi.file_wrapper so gunicorn sends it
+    with zero-copy sendfile. on_close is called once the response is finished,
+    including when no body is sent.
+    """
+    stat = os.stat(file_path)
+    size = stat.st_size
+    etag = make_etag(stat)
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+
+    response = Response(direct_passthrough=True)
+    response.headers['ETag'] = quote_etag(etag)
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = f'private, max-age={max_age}'
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    response.mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+
+    def finish(status: int) -> Response:
+        response.status_code = status
+        response.content_length = 0
+        if on_close:
+            on_close()
+        return response
+
+    # If-None-Match / If-Modified-Since
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return finish(304)
+
+    start, length, status = 0, size, 200
+    byte_range = request.range
+    if byte_range is not None and _if_range_matches(request, etag, stat.st_mtime):
+        bounds = byte_range.range_for_length(size)
+        if bounds is None:
+            if len(byte_range.ranges) == 1:
+                response.headers['Content-Range'] = f'bytes */{size}'
+                return finish(416)
+            # Multiple ranges are not supported; fall back to the full body
+        else:
+            start, stop = bounds
+            length = stop - start
+            status = 206
+            response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+
+    f = open(file_path, 'rb')
+    f.seek(start)
+    response.response = wrap_file(request.environ, RangeFile(f, length, on_close), BUFFER_SIZE)
+    response.status_code = status
+    response.content_length = length
+    return response
+
+
+def _if_range_matches(request: Request, etag: str, mtime: float) -> bool:
+    """A Range header only applies if If-Range is absent or still matches the file"""
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return int(if_range.date.timestamp()) == int(mtime)
+    return True
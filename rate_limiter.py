@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+# Hosts that are served by the same upstream and should share a limit
+HOST_ALIASES = {
+    'youtu.be': 'youtube.com',
+}
+
+# Error text that means the host wants us to slow down
+THROTTLE_SIGNALS = (
+    'HTTP Error 403',
+    'HTTP Error 429',
+    'Too Many Requests',
+    "Sign in to confirm you're not a bot",
+)
+
+# Longest a yt-dlp retry waits, however far the rate has backed off
+MAX_RETRY_DELAY = 60.0
+
+
+def is_throttled(error_msg: str) -> bool:
+    return any(signal in error_msg for signal in THROTTLE_SIGNALS)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at a fixed rate"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate  # Tokens added per second
+        self.burst = burst  # Maximum tokens held at once
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self) -> float:
+        """Block until a token is available; returns the time spent waiting"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket whose rate grows while requests succeed and halves when the host pushes back
+
+    Each success adds `increase` requests per second, up to max_rate; a
+    throttling signal multiplies the rate by `backoff`, down to min_rate, and
+    empties the bucket so queued bursts stop at once. Signals arriving within
+    `cooldown` seconds of a backoff are treated as the same event, since
+    concurrent jobs tend to fail together.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: float, max_rate: float,
+                 increase: float = 0.1, backoff: float = 0.5, cooldown: float = 10.0):
+        super().__init__(rate, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.successes = 0
+        self.throttles = 0
+        self.last_throttle: Optional[float] = None
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self) -> bool:
+        """Back off unless this signal belongs to the last backoff; returns whether the rate dropped"""
+        with self._lock:
+            now = time.monotonic()
+            if self.last_throttle is not None and now - self.last_throttle < self.cooldown:
+                return False
+            self._refill(now)
+            self.throttles += 1
+            self.last_throttle = now
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+            self.tokens = min(self.tokens, 0.0)
+            return True
+
+    def retry_delay(self, n: int) -> float:
+        """Sleep before a retry, exponential in the current request interval
+
+        Usable as a yt-dlp retry_sleep_function, which is called as
+        sleep_func(n=...) with n retries already made (0 before the first).
+        Only reads the rate: a retry inside one request does not take a token.
+        """
+        return min(MAX_RETRY_DELAY, 2 ** n / self.rate)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'rate': round(self.rate, 3),
+                'tokens': round(self.tokens, 2),
+                'successes': self.successes,
+                'throttles': self.throttles,
+                'seconds_since_throttle': (
+                    round(time.monotonic() - self.last_throttle, 1) if self.last_throttle is not None else None
+                ),
+            }
+
+
+class HostRateLimiter:
+    """Keeps one adaptive token bucket per host so different sites don't throttle each other
+
+    Every host starts at `rate` requests per second and then follows its own
+    feedback: record_success() speeds it up, record_error() with a 403, 429
+    or bot-detection message slows it down.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: float = 3.0, min_rate: float = 0.05,
+                 max_rate: float = 5.0, increase: float = 0.1, backoff: float = 0.5):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.backoff = backoff
+        self._buckets: Dict[str, AdaptiveTokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        """Group hosts by registrable name so www./m. variants share a bucket"""
+        host = (urlparse(url).hostname or '').lower()
+        parts = host.split('.')
+        key = '.'.join(parts[-2:]) if len(parts) > 2 else host
+        return HOST_ALIASES.get(key, key)
+
+    def bucket(self, url: str) -> AdaptiveTokenBucket:
+        key = self.host_key(url)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = AdaptiveTokenBucket(
+                    self.rate, self.burst, self.min_rate, self.max_rate, self.increase, self.backoff
+                )
+            return self._buckets[key]
+
+    def acquire(self, url: str) -> float:
+        """Wait for permission to send a request to the URL's host"""
+        return self.bucket(url).acquire()
+
+    def record_success(self, url: str) -> None:
+        self.bucket(url).on_success()
+
+    def record_error(self, url: str, error_msg: str) -> bool:
+        """Back off the host if the error says it is throttling us; other errors are ignored"""
+        if not is_throttled(error_msg):
+            return False
+        return self.bucket(url).on_throttle()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {host: bucket.snapshot() for host, bucket in sorted(buckets.items())}
+
+
+_limiter: Optional[HostRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_host_rate_limiter() -> HostRateLimiter:
+    """The process-wide limiter, configured by the HOST_RATE_* environment variables"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = HostRateLimiter(
+                rate=float(os.getenv('HOST_RATE_LIMIT', 1.0)),
+                burst=float(os.getenv('HOST_RATE_BURST', 3)),
+                min_rate=float(os.getenv('HOST_RATE_MIN', 0.05)),
+                max_rate=float(os.getenv('HOST_RATE_MAX', 5.0)),
+                increase=float(os.getenv('HOST_RATE_INCREASE', 0.1)),
+                backoff=float(os.getenv('HOST_RATE_BACKOFF', 0.5))
+            )
+        return _limiter
@@ -0,0 +1,335 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+# Kept apart from yt-dlp's own "<output>.part" so neither resumes the other's file
+PART_SUFFIX = '.segpart'
+STATE_SUFFIX = '.segpart.json'
+
+
+class SessionPool:
+    """Keep-alive requests Sessions, one per (proxy, host) pair"""
+
+    def __init__(self, max_connections: int = 16):
+        self.max_connections = max_connections
+        self._sessions: Dict[Tuple[str, str], requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, proxy: Optional[str] = None) -> requests.Session:
+        key = (proxy or '', urlparse(url).netloc)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                if proxy:
+                    session.proxies = {'http': proxy, 'https': proxy}
+                self._sessions[key] = session
+            return session
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class SegmentedDownloader:
+    """Download a file as parallel byte ranges written in place with pwrite
+
+    The file is preallocated and split into segments that worker threads take
+    from a shared queue. Workers start at initial_workers; while adding one
+    keeps raising the measured throughput by at least growth_threshold,
+    another is added (up to max_workers), and one is retired when throughput
+    drops. Servers that ignore Range get a single streamed request.
+
+    Ranged downloads are resumable: the partial file is kept next to a JSON
+    sidecar listing the byte ranges still missing and the source's size,
+    ETag and Last-Modified. A later call for the same output path carries on
+    from there if the source still matches, and starts over if it changed.
+    """
+
+    def __init__(self, sessions: Optional[SessionPool] = None, max_workers: int = 8,
+                 initial_workers: int = 2, min_segment_size: int = 1024 * 1024,
+                 chunk_size: int = 256 * 1024, timeout: Tuple[float, float] = (10, 30),
+                 segment_retries: int = 3, growth_threshold: float = 0.1,
+                 sample_interval: float = 1.0):
+        self.sessions = sessions or SessionPool(max_workers)
+        self.max_workers = max_workers
+        self.initial_workers = initial_workers
+        self.min_segment_size = min_segment_size
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.segment_retries = segment_retries
+        self.growth_threshold = growth_threshold
+        self.sample_interval = sample_interval
+        self.logger = logging.getLogger(__name__)
+
+    def probe(self, session: requests.Session, url: str,
+              headers: Dict[str, str]) -> Tuple[Dict[str, Any], Optional[requests.Response]]:
+        """Ask for the first byte
+
+        Returns the source's identity (size, ETag, Last-Modified, range
+        support) and, when the server ignored Range, the full response to stream.
+        """
+        response = session.get(url, headers=dict(headers, Range='bytes=0-0'), stream=True, timeout=self.timeout)
+        if response.status_code not in (200, 206):
+            response.close()
+            raise requests.HTTPError(f'HTTP {response.status_code}', response=response)
+        source = {
+            'size': None,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'ranged': False
+        }
+        if response.status_code == 200:
+            length = response.headers.get('Content-Length')
+            source['size'] = int(length) if length else None
+            return source, response
+        response.close()
+        match = CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+        if match and match.group(3) != '*':
+            source['size'] = int(match.group(3))
+            source['ranged'] = source['size'] > 0
+        return source, None
+
+    def download(self, url: str, output_path: str, headers: Optional[Dict[str, str]] = None,
+                 proxy: Optional[str] = None) -> bool:
+        """Fetch url into output_path; returns False if the transfer could not be completed
+
+        After a failed ranged transfer the partial file is kept for the next call.
+        """
+        headers = headers or {}
+        session = self.sessions.get(url, proxy)
+        part_path = f'{output_path}{PART_SUFFIX}'
+        streaming = False
+        try:
+            source, response = self.probe(session, url, headers)
+            if not source['ranged']:
+                streaming = True
+                self.discard_partial(output_path)
+                if response is None:
+                    response = session.get(url, headers=headers, stream=True, timeout=self.timeout)
+                    response.raise_for_status()
+                ok = self._stream(response, part_path, source['size'])
+            else:
+                ok = self._download_segments(session, url, headers, output_path, source)
+            if ok:
+                os.replace(part_path, output_path)
+                self.discard_partial(output_path)
+            return ok
+        except (requests.RequestException, OSError) as e:
+            self.logger.error(f"Segmented download failed: {e}")
+            return False
+        finally:
+            if streaming and os.path.exists(part_path):
+                os.remove(part_path)
+
+    def discard_partial(self, output_path: str) -> None:
+        for suffix in (PART_SUFFIX, STATE_SUFFIX):
+            try:
+                os.remove(f'{output_path}{suffix}')
+            except FileNotFoundError:
+                pass
+
+    def _load_state(self, output_path: str, source: Dict[str, Any]) -> Optional[List[List[int]]]:
+        """Ranges still missing from a previous attempt, if it was for the same content"""
+        try:
+            with open(f'{output_path}{STATE_SUFFIX}') as f:
+                state = json.load(f)
+            if os.path.getsize(f'{output_path}{PART_SUFFIX}') != source['size']:
+                return None
+        except (OSError, ValueError):
+            return None
+        # Direct media URLs are often re-signed per request, so the output path
+        # identifies the download; the validators decide whether it is the same file
+        if any(state.get(key) != source[key] for key in ('size', 'etag', 'last_modified')):
+            self.logger.info(f"Source changed since the partial download of {output_path}; starting over")
+            return None
+        if not state.get('etag') and not state.get('last_modified'):
+            # Nothing to tell a changed source apart by
+            return None
+        return state.get('remaining')
+
+    def _save_state(self, output_path: str, fd: int, transfer: '_Transfer') -> None:
+        """Record the ranges still missing; data is synced first so the sidecar never runs ahead of it"""
+        os.fsync(fd)
+        state = dict(transfer.source, remaining=transfer.remaining())
+        state_path = f'{output_path}{STATE_SUFFIX}'
+        tmp_path = f'{state_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    def _stream(self, response: requests.Response, part_path: str, total: Optional[int]) -> bool:
+        """Single-connection fallback for servers without range support"""
+        written = 0
+        with response, open(part_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                f.write(chunk)
+                written += len(chunk)
+        return total is None or written == total
+
+    def _download_segments(self, session: requests.Session, url: str, headers: Dict[str, str],
+                           output_path: str, source: Dict[str, Any]) -> bool:
+        total = source['size']
+        part_path = f'{output_path}{PART_SUFFIX}'
+        remaining = self._load_state(output_path, source)
+        # Enough segments that every worker gets several, so fast workers pick up the slack
+        segment_size = max(self.min_segment_size, total // (self.max_workers * 4))
+        if remaining is None:
+            ranges = [(start, min(start + segment_size, total) - 1) for start in range(0, total, segment_size)]
+            fd = os.open(part_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        else:
+            # Re-split what is left so a resumed download still spreads over the workers
+            ranges = [(start, min(start + segment_size, end + 1) - 1)
+                      for start, end in remaining for start in range(start, end + 1, segment_size)]
+            fd = os.open(part_path, os.O_RDWR)
+            self.logger.info(f"Resuming {output_path}: {total - sum(e - s + 1 for s, e in ranges)} of {total} bytes kept")
+        if source['etag'] and not source['etag'].startswith('W/'):
+            validator = source['etag']
+        else:
+            validator = source['last_modified']
+        if validator:
+            # The server answers with the whole file instead of a range if the
+            # content changed mid-download, which _fetch_segment rejects
+            headers = dict(headers, **{'If-Range': validator})
+        transfer = _Transfer(deque(ranges), source)
+        transfer.done = total - sum(end - start + 1 for start, end in ranges)
+        try:
+            if remaining is None:
+                if hasattr(os, 'posix_fallocate'):
+                    os.posix_fallocate(fd, 0, total)
+                else:
+                    os.ftruncate(fd, total)
+
+            def start_worker() -> None:
+                thread = threading.Thread(
+                    target=self._worker, args=(session, url, headers, fd, transfer), daemon=True
+                )
+                transfer.workers.append(thread)
+                thread.start()
+
+            for _ in range(min(self.initial_workers, len(transfer.segments))):
+                start_worker()
+            self._adapt(transfer, start_worker, lambda: self._save_state(output_path, fd, transfer))
+            for thread in transfer.workers:
+                thread.join()
+            if transfer.error is not None or transfer.done != total:
+                self._save_state(output_path, fd, transfer)
+                return False
+            return True
+        finally:
+            os.close(fd)
+
+    def _adapt(self, transfer: '_Transfer', start_worker, checkpoint) -> None:
+        """Grow or shrink the worker count from throughput samples until the transfer ends
+
+        checkpoint() runs on every sample so a killed process can still resume.
+        """
+        last_done, last_rate = transfer.done, 0.0
+        while any(t.is_alive() for t in transfer.workers):
+            time.sleep(self.sample_interval)
+            checkpoint()
+            with transfer.lock:
+                done, pending, active = transfer.done, len(transfer.segments), transfer.active
+            rate = (done - last_done) / self.sample_interval
+            last_done = done
+            if transfer.error or not pending:
+                continue
+            if rate > last_rate * (1 + self.growth_threshold) and active < self.max_workers:
+                start_worker()
+            elif rate < last_rate * (1 - self.growth_threshold) and active > 1:
+                with transfer.lock:
+                    transfer.retire += 1
+            last_rate = rate
+
+    def _worker(self, session: requests.Session, url: str, headers: Dict[str, str],
+                fd: int, transfer: '_Transfer') -> None:
+        me = threading.get_ident()
+        with transfer.lock:
+            transfer.active += 1
+        try:
+            while True:
+                with transfer.lock:
+                    if transfer.error or not transfer.segments:
+                        return
+                    if transfer.retire and transfer.active > 1:
+                        transfer.retire -= 1
+                        return
+                    start, end = transfer.segments.popleft()
+                    transfer.in_flight[me] = [start, end]
+                for attempt in range(self.segment_retries):
+                    try:
+                        self._fetch_segment(session, url, headers, fd, transfer, me)
+                        break
+                    except (requests.RequestException, OSError, ValueError) as e:
+                        self.logger.warning(f"Segment {start}-{end} failed (attempt {attempt + 1}): {e}")
+                else:
+                    with transfer.lock:
+                        transfer.error = f'Segment {start}-{end} failed'
+                    return
+                with transfer.lock:
+                    del transfer.in_flight[me]
+        finally:
+            with transfer.lock:
+                transfer.active -= 1
+
+    def _fetch_segment(self, session: requests.Session, url: str, headers: Dict[str, str],
+                       fd: int, transfer: '_Transfer', me: int) -> None:
+        """Fetch the rest of this worker's range; progress survives a failure so a retry continues from it"""
+        with transfer.lock:
+            offset, end = transfer.in_flight[me]
+        response = session.get(url, headers=dict(headers, Range=f'bytes={offset}-{end}'),
+                               stream=True, timeout=self.timeout)
+        with response:
+            match = CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+            if response.status_code != 206 or not match or int(match.group(1)) != offset:
+                raise ValueError(f'Unexpected range response (HTTP {response.status_code})')
+            if match.group(3) != '*' and int(match.group(3)) != transfer.source['size']:
+                raise ValueError('Source size changed during the download')
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if offset + len(chunk) > end + 1:
+                    raise ValueError('Server sent more than the requested range')
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+                with transfer.lock:
+                    transfer.done += len(chunk)
+                    transfer.in_flight[me][0] = offset
+        if offset != end + 1:
+            raise ValueError(f'Range ended early at {offset}')
+
+
+class _Transfer:
+    """Shared state of one segmented download"""
+
+    def __init__(self, segments: Deque[Tuple[int, int]], source: Dict[str, Any]):
+        self.segments = segments
+        self.source = {key: source[key] for key in ('size', 'etag', 'last_modified')}
+        self.lock = threading.Lock()
+        self.done = 0
+        self.active = 0
+        self.retire = 0
+        self.error: Optional[str] = None
+        self.workers = []
+        # Worker thread id -> [next offset, end] of the range it is fetching
+        self.in_flight: Dict[int, List[int]] = {}
+
+    def remaining(self) -> List[List[int]]:
+        """Byte ranges not yet written, queued or partly fetched"""
+        with self.lock:
+            ranges = [list(r) for r in self.segments]
+            ranges += [[offset, end] for offset, end in self.in_flight.values() if offset <= end]
+        return sorted(ranges)
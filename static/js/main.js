@@ -112,7 +112,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
-                    url,
+                    urls: [url],
                     quality: qualitySelect.value
                 })
             });
@@ -124,36 +124,39 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
 
-            // Poll for progress
-            const progressInterval = setInterval(async () => {
-                try {
-                    const progressResponse = await fetch(`/api/progress/${data.filename}`);
-                    const progressData = await progressResponse.json();
-                    
-                    if (progressData.error) {
-                        clearInterval(progressInterval);
-                        showMessage(progressData.error, 'error');
-                        activeDownloads.delete(url);
-                        return;
-                    }
-
-                    progressBarInner.style.width = `${progressData.progress}%`;
-
-                    if (progressData.status === 'completed') {
-                        clearInterval(progressInterval);
-                        showMessage(`Download completed: ${data.filename}`);
-                        activeDownloads.delete(url);
-                    } else if (progressData.status === 'error') {
-                        clearInterval(progressInterval);
-                        showMessage(progressData.error || 'Download failed', 'error');
-                        activeDownloads.delete(url);
-                    }
-                } catch (error) {
-                    clearInterval(progressInterval);
+            // The download runs as a queued job on the server, or is already on disk
+            const job = data.results[0];
+            if (job.status === 'error') {
+                showMessage(`Failed to download: ${job.error}`, 'error');
+                activeDownloads.delete(url);
+                return;
+            }
+
+            // Stream progress updates from the server
+            const source = new EventSource(`/api/progress/stream?jobs=${encodeURIComponent(job.job_id)}`);
+
+            source.addEventListener('progress', event => {
+                const progressData = JSON.parse(event.data);
+                progressBarInner.style.width = `${progressData.progress || 0}%`;
+
+                if (progressData.status === 'completed') {
+                    source.close();
+                    showMessage(`Download completed: ${job.filename}`);
+                    activeDownloads.delete(url);
+                } else if (progressData.status === 'error') {
+                    source.close();
+                    showMessage(progressData.error || 'Download failed', 'error');
+                    activeDownloads.delete(url);
+                }
+            });
+
+            source.onerror = () => {
+                // EventSource reconnects by itself; only give up once it stops trying
+                if (source.readyState === EventSource.CLOSED) {
                     showMessage('Failed to fetch download progress', 'error');
                     activeDownloads.delete(url);
                 }
-            }, 1000);
+            };
 
         } catch (error) {
             showMessage('Failed to start download', 'error');
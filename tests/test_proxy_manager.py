@@ -0,0 +1,91 @@
+"""ProxyManager against local stand-in proxies: one that answers every request, one that is not listening"""
+import http.server
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from proxy_manager import OPEN, ProxyManager, validate_proxies  # noqa: E402
+
+# Never resolved: the stand-in proxy answers for any host
+TEST_URL = 'http://stand-in.test/'
+
+
+class StandInProxy(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def good_proxy():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInProxy)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dead_proxy():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    return f'127.0.0.1:{port}'
+
+
+@pytest.fixture
+def manager(tmp_path, good_proxy, dead_proxy):
+    # A seed file, so the checker probes these instead of fetching public lists
+    proxy_file = tmp_path / 'proxies.txt'
+    proxy_file.write_text(f'{good_proxy}\n{dead_proxy}')
+    # One round of checks only, so the tests' own results are the only ones that follow
+    manager = ProxyManager(test_urls=[TEST_URL], check_interval=60, check_timeout=1,
+                           warmup_timeout=5, proxy_file=str(proxy_file))
+    yield manager
+    manager.close()
+
+
+def test_get_proxy_picks_the_working_proxy(manager, good_proxy):
+    proxy = manager.get_proxy()
+    assert proxy == {'http': f'http://{good_proxy}', 'https': f'http://{good_proxy}'}
+    assert manager.stats()['healthy'] == 1
+
+
+def test_proxy_failures_open_the_breaker(manager, good_proxy):
+    proxy = manager.get_proxy()
+    for _ in range(3):
+        assert manager.record_result(proxy, 'Unable to connect to proxy: Connection refused')
+    assert manager.health[good_proxy].state == OPEN
+    assert manager.get_proxy() is None
+
+
+def test_video_errors_do_not_count_against_the_proxy(manager, good_proxy):
+    proxy = manager.get_proxy()
+    for _ in range(5):
+        assert not manager.record_result(proxy, 'ERROR: [youtube] abc: Private video')
+    assert manager.health[good_proxy].consecutive_failures == 0
+    assert manager.get_proxy() == proxy
+
+
+def test_successful_download_keeps_the_probe_latency(manager, good_proxy):
+    proxy = manager.get_proxy()
+    health = manager.health[good_proxy]
+    latency = health.latency
+    successes = health.successes
+    assert manager.record_result(proxy)
+    assert health.latency == latency
+    assert health.successes == successes + 1
+
+
+def test_validate_proxies_keeps_only_working(good_proxy, dead_proxy):
+    working = validate_proxies([good_proxy, dead_proxy], TEST_URL, timeout=2)
+    assert [address for address, _ in working] == [good_proxy]
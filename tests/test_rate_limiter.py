@@ -0,0 +1,45 @@
+"""AdaptiveTokenBucket.retry_delay as yt-dlp calls it from its retry loop"""
+import os
+import sys
+import time
+
+import pytest
+from yt_dlp.utils import RetryManager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rate_limiter import MAX_RETRY_DELAY, AdaptiveTokenBucket  # noqa: E402
+
+
+@pytest.fixture
+def bucket():
+    return AdaptiveTokenBucket(rate=2.0, burst=3, min_rate=0.05, max_rate=5.0)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(time, 'sleep', slept.append)
+    return slept
+
+
+def test_retry_delay_works_as_yt_dlp_sleep_function(bucket, sleeps):
+    for count in range(1, 4):
+        RetryManager.report_retry(Exception('HTTP Error 503'), count, 15, sleep_func=bucket.retry_delay,
+                                  info=lambda msg: None, warn=lambda msg: None)
+    # 2 requests per second: half a second, then doubling
+    assert sleeps == [0.5, 1.0, 2.0]
+
+
+def test_retry_delay_does_not_take_tokens(bucket, sleeps):
+    tokens = bucket.tokens
+    for count in range(1, 16):
+        RetryManager.report_retry(Exception('HTTP Error 503'), count, 15, sleep_func=bucket.retry_delay,
+                                  info=lambda msg: None, warn=lambda msg: None)
+    assert bucket.tokens == tokens
+    assert max(sleeps) == MAX_RETRY_DELAY
+
+
+def test_retry_delay_stretches_after_a_throttle(bucket):
+    before = bucket.retry_delay(0)
+    bucket.on_throttle()
+    assert bucket.retry_delay(0) == before * 2
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+
+class TranscodePool:
+    """Runs ffmpeg jobs in worker processes within a fixed CPU budget
+
+    The budget (in cores, defaulting to every core on the host) is split
+    between the number of jobs that run at once and the encoder threads each
+    job may use, so a batch of uploads keeps every core busy without
+    oversubscribing them. Jobs are submitted with threads=threads_per_job.
+    """
+
+    def __init__(self, cpu_budget: int = 0, max_jobs: int = 0):
+        self.cores = os.cpu_count() or 1
+        self.cpu_budget = max(1, cpu_budget or self.cores)
+        # x264 scales well up to a few threads per encode; beyond that, more
+        # encodes side by side get more done than more threads on one encode
+        self.max_jobs = max(1, min(max_jobs or self.cpu_budget // 2, self.cpu_budget))
+        self.threads_per_job = max(1, self.cpu_budget // self.max_jobs)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _pool(self, replace: bool = False) -> ProcessPoolExecutor:
+        """Create the worker processes on first use, after a fork, or once the pool is broken"""
+        with self._lock:
+            if replace and self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._executor is None or self._pid != os.getpid():
+                # Spawned workers don't inherit the server's threads and locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_jobs,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Run func(*args, threads=threads_per_job, **kwargs) in a worker process
+
+        func must be importable from a fresh interpreter, i.e. a module-level
+        function outside app.py.
+        """
+        kwargs.setdefault('threads', self.threads_per_job)
+        try:
+            return self._pool().submit(func, *args, **kwargs)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool
+            return self._pool(replace=True).submit(func, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'cores': self.cores,
+            'cpu_budget': self.cpu_budget,
+            'max_jobs': self.max_jobs,
+            'threads_per_job': self.threads_per_job
+        }
@@ -0,0 +1,239 @@
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import ffmpeg
+
+# Encoder and Annex B bitstream filter for codecs that can be cut without a full re-encode
+SMART_CUT_CODECS = {
+    'h264': ('libx264', 'h264_mp4toannexb'),
+    'hevc': ('libx265', 'hevc_mp4toannexb'),
+}
+
+# Cuts closer than this to a keyframe are treated as landing on it
+KEYFRAME_EPSILON = 0.01
+
+# Share of a size target reserved for MP4 headers and indexes
+CONTAINER_OVERHEAD = 0.02
+MIN_VIDEO_KBPS = 50
+
+
+def probe(input_path: str) -> Dict[str, Any]:
+    """ffprobe the input and return its format and stream info"""
+    return ffmpeg.probe(input_path)
+
+
+def get_video_stream(info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return next((s for s in info.get('streams', []) if s.get('codec_type') == 'video'), None)
+
+
+def has_audio(info: Dict[str, Any]) -> bool:
+    return any(s.get('codec_type') == 'audio' for s in info.get('streams', []))
+
+
+def get_duration(info: Dict[str, Any]) -> float:
+    return float(info.get('format', {}).get('duration') or 0)
+
+
+def _keyframe_packets(input_path: str, read_intervals: Optional[str] = None) -> List[Dict[str, Any]]:
+    kwargs = {'read_intervals': read_intervals} if read_intervals else {}
+    info = ffmpeg.probe(input_path, select_streams='v:0', show_entries='packet=pts_time,dts_time,flags', **kwargs)
+    return [
+        p for p in info.get('packets', [])
+        if 'K' in p.get('flags', '') and p.get('pts_time') not in (None, 'N/A')
+    ]
+
+
+def get_keyframes(input_path: str, start: float, end: float) -> List[float]:
+    """Keyframe timestamps of the first video stream around [start, end]
+
+    Reads packet flags only, so nothing is decoded.
+    """
+    read_from = max(0.0, start - 60)
+    packets = _keyframe_packets(input_path, f'{read_from}%{end + 1}')
+    return sorted(float(p['pts_time']) for p in packets)
+
+
+def _run(stream) -> None:
+    ffmpeg.run(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
+
+
+def trim_copy(input_path: str, output_path: str, start: float, end: float,
+              keyframes: Optional[List[float]] = None) -> None:
+    """Cut without re-encoding, starting at the keyframe at or before start
+
+    The clip may begin up to one GOP early; nothing is decoded, so this takes
+    about as long as copying the bytes.
+    """
+    if keyframes is None:
+        keyframes = get_keyframes(input_path, start, end)
+    cut_start = max([k for k in keyframes if k <= start + KEYFRAME_EPSILON] or [0.0])
+    stream = ffmpeg.input(input_path, ss=cut_start)
+    stream = ffmpeg.output(stream, output_path, t=end - cut_start, c='copy',
+                           map='0', avoid_negative_ts='make_zero', movflags='+faststart')
+    _run(stream)
+
+
+def trim_reencode(input_path: str, output_path: str, start: float, end: float,
+                  threads: int = 0, **encode_args) -> None:
+    """Frame-accurate cut that re-encodes the whole range"""
+    stream = ffmpeg.input(input_path, ss=start, t=end - start)
+    args = {'c:v': 'libx264', 'c:a': 'aac', 'b:a': '128k', 'threads': threads, 'movflags': '+faststart'}
+    args.update(encode_args)
+    _run(ffmpeg.output(stream, output_path, **args))
+
+
+def trim_exact(input_path: str, output_path: str, start: float, end: float,
+               info: Optional[Dict[str, Any]] = None, threads: int = 0) -> None:
+    """Frame-accurate cut that only re-encodes the partial GOPs at either boundary
+
+    The video between the first and last keyframe inside the range is copied;
+    the head before the first keyframe and the tail after the last one are
+    re-encoded and the three pieces joined with the concat demuxer. Every
+    piece carries its parameter sets in-band, so the encoder settings of the
+    head and tail don't have to match the source. Audio is cheap to encode,
+    so the whole range is encoded once and muxed in.
+    """
+    info = info or probe(input_path)
+    video = get_video_stream(info)
+    codec = SMART_CUT_CODECS.get(video.get('codec_name')) if video else None
+    keyframes = [k for k in get_keyframes(input_path, start, end) if start <= k <= end]
+    if not codec or not keyframes:
+        trim_reencode(input_path, output_path, start, end, threads=threads)
+        return
+
+    encoder, bsf = codec
+    first_key, last_key = keyframes[0], keyframes[-1]
+    encode_args = {
+        'c:v': encoder,
+        'pix_fmt': video.get('pix_fmt', 'yuv420p'),
+        'bsf:v': bsf,
+        'threads': threads,
+        'an': None,
+        'f': 'matroska',
+    }
+    if video.get('avg_frame_rate') not in (None, '0/0'):
+        encode_args['r'] = video['avg_frame_rate']
+
+    work_dir = tempfile.mkdtemp(prefix='trim_')
+    try:
+        # (path, duration, outpoint) for each piece of the concat list
+        segments = []
+        if first_key - start > KEYFRAME_EPSILON:
+            head = os.path.join(work_dir, 'head.mkv')
+            _run(ffmpeg.output(ffmpeg.input(input_path, ss=start, t=first_key - start), head, **encode_args))
+            segments.append((head, first_key - start, None))
+        if last_key - first_key > KEYFRAME_EPSILON:
+            middle = os.path.join(work_dir, 'middle.mkv')
+            span = last_key - first_key
+            _run(ffmpeg.output(
+                ffmpeg.input(input_path, ss=first_key, t=span),
+                middle, **{'c:v': 'copy', 'bsf:v': bsf, 'an': None, 'f': 'matroska'}
+            ))
+            segments.append((middle, span, _copy_outpoint(middle, span)))
+        if end - last_key > KEYFRAME_EPSILON:
+            tail = os.path.join(work_dir, 'tail.mkv')
+            _run(ffmpeg.output(ffmpeg.input(input_path, ss=last_key, t=end - last_key), tail, **encode_args))
+            segments.append((tail, end - last_key, None))
+
+        list_path = os.path.join(work_dir, 'segments.txt')
+        with open(list_path, 'w') as f:
+            for path, duration, outpoint in segments:
+                f.write(f"file '{path}'\nduration {duration:.6f}\n")
+                if outpoint is not None:
+                    f.write(f'outpoint {outpoint:.6f}\n')
+
+        joined = ffmpeg.input(list_path, f='concat', safe=0)
+        output_args = {'c:v': 'copy', 't': end - start, 'movflags': '+faststart'}
+        if has_audio(info):
+            audio = ffmpeg.input(input_path, ss=start, t=end - start)
+            stream = ffmpeg.output(joined['v'], audio['a'], output_path,
+                                   **output_args, **{'c:a': 'aac', 'b:a': '128k'})
+        else:
+            stream = ffmpeg.output(joined['v'], output_path, **output_args)
+        _run(stream)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _copy_outpoint(path: str, span: float) -> Optional[float]:
+    """Decode timestamp at which a stream-copied segment should stop
+
+    Copying up to a keyframe also pulls in that keyframe (and frames decoded
+    right after it), since their decode timestamps fall inside the range. The
+    concat demuxer cuts on decode time, so stop at the keyframe's dts.
+    """
+    for packet in _keyframe_packets(path):
+        if float(packet['pts_time']) >= span - KEYFRAME_EPSILON and packet.get('dts_time') not in (None, 'N/A'):
+            return float(packet['dts_time'])
+    return None
+
+
+def trim(input_path: str, output_path: str, start: float, end: float,
+         exact: bool = False, threads: int = 0) -> None:
+    """Trim [start, end] from the input, by stream copy unless an exact cut is requested"""
+    info = probe(input_path)
+    duration = get_duration(info)
+    if duration:
+        end = min(end, duration)
+    if end <= start:
+        raise ValueError(f'Start time {start}s is beyond the end of the video ({duration:.2f}s)')
+    if exact:
+        trim_exact(input_path, output_path, start, end, info=info, threads=threads)
+    else:
+        trim_copy(input_path, output_path, start, end)
+
+
+def compress_bitrates(target_size: float, duration: float) -> Tuple[int, int]:
+    """Video and audio bitrates (kbps) that fit duration seconds into target_size bytes"""
+    total_kbps = target_size * 8 / duration / 1000
+    # Leave room for the container; starve the audio before the video on tiny targets
+    audio_kbps = 128 if total_kbps >= 512 else 64
+    video_kbps = max(int(total_kbps * (1 - CONTAINER_OVERHEAD)) - audio_kbps, MIN_VIDEO_KBPS)
+    return video_kbps, audio_kbps
+
+
+def compress(input_path: str, output_path: str, start: float, end: float,
+             target_size: float, threads: int = 0, preset: Optional[str] = None) -> None:
+    """Trim and re-encode so the output lands near target_size bytes"""
+    info = probe(input_path)
+    duration = get_duration(info)
+    if duration:
+        end = min(end, duration)
+    if end <= start:
+        raise ValueError(f'Start time {start}s is beyond the end of the video ({duration:.2f}s)')
+
+    video_kbps, audio_kbps = compress_bitrates(target_size, end - start)
+    encode_args = {
+        'b:v': f'{video_kbps}k',
+        'maxrate': f'{int(video_kbps * 1.5)}k',
+        'bufsize': f'{video_kbps * 3}k',
+        'b:a': f'{audio_kbps}k',
+    }
+    if preset:
+        encode_args['preset'] = preset
+    trim_reencode(input_path, output_path, start, end, threads=threads, **encode_args)
+
+
+def process_clip(input_path: str, output_path: str, start: float, end: float,
+                 target_size: Optional[float] = None, exact: bool = False,
+                 threads: int = 0, preset: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+    """Trim or compress one clip, returning (success, error message)
+
+    Errors are returned rather than raised so the result crosses process
+    boundaries as plain data.
+    """
+    try:
+        if target_size:
+            # Compression needs a re-encode anyway
+            compress(input_path, output_path, start, end, target_size, threads=threads, preset=preset)
+        else:
+            # Keyframe-aware stream copy; exact cuts re-encode only the boundary GOPs
+            trim(input_path, output_path, start, end, exact=exact, threads=threads)
+        return True, None
+    except ffmpeg.Error as e:
+        stderr = (e.stderr or b'').decode('utf-8', 'replace').strip().splitlines()
+        return False, stderr[-1] if stderr else str(e)
+    except Exception as e:
+        return False, str(e)
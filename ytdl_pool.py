@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import yt_dlp
+
+from cookie_store import get_cookie_store
+
+# Options read each time they are used, so they can change between jobs on the same instance
+PER_JOB_OPTIONS = ('outtmpl', 'progress_hooks', 'postprocessor_hooks', 'post_hooks', 'logger',
+                   'sleep_interval', 'max_sleep_interval')
+# The User-Agent is picked at random per call; an instance keeps the one it was built with
+USER_AGENT_OPTIONS = ('user_agent',)
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable stand-in for an option value, equal for equal options"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_freeze(v) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    code = getattr(value, '__code__', None)
+    if code is not None:
+        # The same lambda built by two calls to get_yt_dlp_opts is the same option;
+        # bound methods (a host's retry_delay) are only equal for the same object
+        cells = tuple(_freeze(cell.cell_contents) for cell in getattr(value, '__closure__', None) or ())
+        return (code, cells, getattr(value, '__self__', None))
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ('id', id(value))
+
+
+def profile_key(opts: Dict[str, Any]) -> Tuple:
+    """The options an instance is built from: format, cookies, proxy and everything else set at init"""
+    shared = {k: v for k, v in opts.items() if k not in PER_JOB_OPTIONS and k not in USER_AGENT_OPTIONS}
+    headers = shared.get('http_headers')
+    if headers:
+        shared['http_headers'] = {k: v for k, v in headers.items() if k.lower() != 'user-agent'}
+    return _freeze(shared)
+
+
+class YoutubeDLPool:
+    """Warm yt_dlp.YoutubeDL instances, reused by jobs with the same option profile
+
+    Building a YoutubeDL sets up the extractor registry, the request handlers
+    and the cookie jar; a job that borrows an idle instance with the same
+    format, cookies, proxy and other init-time options skips all of it and
+    keeps the extractors' caches warm. Per-job options (output template,
+    hooks, logger, sleep intervals) are applied on borrow and cleared on
+    return. An instance whose job raised is closed rather than reused, so a
+    retry starts from a fresh one.
+    """
+
+    def __init__(self, max_idle_per_profile: int = 4, max_idle: int = 32, idle_timeout: float = 600):
+        self.max_idle_per_profile = max_idle_per_profile
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        # profile -> [(instance, returned at)], least recently used profile first
+        self._idle: 'OrderedDict[Tuple, List[Tuple[yt_dlp.YoutubeDL, float]]]' = OrderedDict()
+        self._idle_count = 0
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def borrow(self, opts: Dict[str, Any]) -> Iterator[yt_dlp.YoutubeDL]:
+        """A YoutubeDL configured by opts, returned to the pool when the block exits cleanly"""
+        key = profile_key(opts)
+        ydl = self._take(key)
+        if ydl is None:
+            # YoutubeDL keeps and mutates the params dict it is given
+            ydl = yt_dlp.YoutubeDL({k: v for k, v in opts.items() if k not in PER_JOB_OPTIONS})
+            self._hold(ydl)
+            with self._lock:
+                self.created += 1
+        else:
+            with self._lock:
+                self.reused += 1
+        self._apply_job(ydl, opts)
+        try:
+            yield ydl
+        except BaseException:
+            self._close(ydl)
+            raise
+        self._apply_job(ydl, {})
+        self._give_back(key, ydl)
+
+    def _take(self, key: Tuple) -> Optional[yt_dlp.YoutubeDL]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if not idle:
+                return None
+            ydl, _ = idle.pop()
+            self._idle_count -= 1
+            if not idle:
+                del self._idle[key]
+            return ydl
+
+    def _give_back(self, key: Tuple, ydl: yt_dlp.YoutubeDL) -> None:
+        evicted = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(idle) >= self.max_idle_per_profile:
+                evicted.append(ydl)
+            else:
+                idle.append((ydl, time.monotonic()))
+                self._idle_count += 1
+            while self._idle_count > self.max_idle:
+                oldest_key, oldest = next(iter(self._idle.items()))
+                evicted.append(oldest.pop(0)[0])
+                self._idle_count -= 1
+                if not oldest:
+                    del self._idle[oldest_key]
+            if not idle and key in self._idle:
+                del self._idle[key]
+        for stale in evicted:
+            self._close(stale)
+
+    @staticmethod
+    def _apply_job(ydl: yt_dlp.YoutubeDL, opts: Dict[str, Any]) -> None:
+        """Point a pooled instance at one job's per-job options and clear the last job's counters"""
+        for name in ('logger', 'sleep_interval', 'max_sleep_interval'):
+            if opts.get(name) is not None:
+                ydl.params[name] = opts[name]
+            else:
+                ydl.params.pop(name, None)
+        ydl.params['outtmpl'] = opts.get('outtmpl') or {}
+        ydl._parse_outtmpl()
+        ydl._progress_hooks = []
+        ydl._postprocessor_hooks = []
+        ydl._post_hooks = []
+        for hook in opts.get('progress_hooks') or []:
+            ydl.add_progress_hook(hook)
+        for hook in opts.get('postprocessor_hooks') or []:
+            ydl.add_postprocessor_hook(hook)
+        for hook in opts.get('post_hooks') or []:
+            ydl.add_post_hook(hook)
+        ydl._download_retcode = 0
+        ydl._num_downloads = 0
+        ydl._num_videos = 0
+        ydl._playlist_level = 0
+        ydl._playlist_urls = set()
+
+    @staticmethod
+    def _hold(ydl: yt_dlp.YoutubeDL) -> None:
+        # The instance reads its cookie file until it is closed
+        cookiefile = ydl.params.get('cookiefile')
+        if cookiefile:
+            get_cookie_store(os.path.dirname(os.path.abspath(cookiefile))).acquire(cookiefile)
+
+    @staticmethod
+    def _close(ydl: yt_dlp.YoutubeDL) -> None:
+        cookiefile = ydl.params.get('cookiefile')
+        store = get_cookie_store(os.path.dirname(os.path.abspath(cookiefile))) if cookiefile else None
+        try:
+            if store is not None and store.owns(cookiefile):
+                # Content-addressed cookie files are read-only: drop the jar's changes
+                # instead of letting close() save them over the file
+                ydl._request_director.close()
+            else:
+                ydl.close()
+        except Exception as e:
+            print(f"Error closing yt-dlp instance: {e}")
+        if store is not None:
+            store.release(cookiefile)
+
+    def prune(self) -> int:
+        """Close instances idle for longer than idle_timeout; returns how many were closed"""
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = []
+        with self._lock:
+            for key in list(self._idle):
+                idle = self._idle[key]
+                fresh = [(ydl, returned) for ydl, returned in idle if returned >= cutoff]
+                stale.extend(ydl for ydl, returned in idle if returned < cutoff)
+                if fresh:
+                    self._idle[key] = fresh
+                else:
+                    del self._idle[key]
+            self._idle_count -= len(stale)
+        for ydl in stale:
+            self._close(ydl)
+        return len(stale)
+
+    def close(self) -> None:
+        with self._lock:
+            idle = [ydl for entries in self._idle.values() for ydl, _ in entries]
+            self._idle.clear()
+            self._idle_count = 0
+        for ydl in idle:
+            self._close(ydl)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'idle': self._idle_count, 'profiles': len(self._idle),
+                    'created': self.created, 'reused': self.reused}
+
+
+_pool: Optional[YoutubeDLPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ytdl_pool() -> YoutubeDLPool:
+    """The process-wide pool, sized by the YTDL_POOL_* environment variables"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = YoutubeDLPool(
+                max_idle_per_profile=int(os.getenv('YTDL_POOL_PER_PROFILE', 4)),
+                max_idle=int(os.getenv('YTDL_POOL_SIZE', 32)),
+                idle_timeout=float(os.getenv('YTDL_POOL_IDLE_TIMEOUT', 600))
+            )
+        return _pool